@@ -0,0 +1,190 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Value
+
+# Версия списков не проверяется (только TTL)
+UNCHECKED = object()
+
+
+def _contains(ids, value):
+    """Бинарный поиск в отсортированном массиве id"""
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def _sorted_ids(values):
+    return array('q', sorted(values))
+
+
+class ACLEntry:
+    """Списки одного пользователя в виде отсортированных массивов id"""
+    __slots__ = ('blacklist', 'blacklisted_by', 'whitelisted_by', 'loaded_at', 'version')
+
+    def __init__(self, blacklist, blacklisted_by, whitelisted_by, version=None):
+        self.blacklist = blacklist
+        self.blacklisted_by = blacklisted_by
+        self.whitelisted_by = whitelisted_by
+        self.loaded_at = time.monotonic()
+        self.version = version
+
+    def is_blacklisted_by(self, author_id):
+        return _contains(self.blacklisted_by, author_id)
+
+    def is_whitelisted_by(self, author_id):
+        return _contains(self.whitelisted_by, author_id)
+
+    def nbytes(self):
+        return sum(
+            ids.itemsize * len(ids) for ids in (self.blacklist, self.blacklisted_by, self.whitelisted_by)
+        )
+
+
+class ACLGraph:
+    """
+    Процессный индекс черных и белых списков.
+    Для каждого пользователя хранит, кого он занес в черный список,
+    у кого он сам в черном списке и у кого он в белом списке.
+    Данные загружаются лениво, сбрасываются сигналами m2m_changed,
+    число пользователей в памяти ограничено (LRU), записи живут не дольше TTL.
+    Сигналы доходят только до своего процесса, поэтому запись сверяется
+    с версией списков пользователя (CustomUser.lists_changed_at, меняется
+    при любом изменении его списков и списков, где он указан): другие воркеры
+    видят изменение, как только перечитают пользователя.
+    """
+
+    def __init__(self, max_users=None, ttl=None):
+        self._max_users = max_users
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_users(self):
+        if self._max_users is not None:
+            return self._max_users
+        return getattr(settings, 'ACL_GRAPH_MAX_USERS', 10000)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'ACL_GRAPH_TTL', 300)
+
+    def _load(self, user_id, version):
+        """Три списка одним запросом (UNION ALL), второй столбец — номер списка"""
+        from .models import CustomUser
+
+        blacklist = CustomUser.blacklist.through.objects
+        whitelist = CustomUser.whitelist.through.objects
+        lists = ([], [], [])
+        rows = blacklist.filter(from_customuser_id=user_id).annotate(kind=Value(0)).values_list(
+            'to_customuser_id', 'kind'
+        ).union(
+            blacklist.filter(to_customuser_id=user_id).annotate(kind=Value(1)).values_list('from_customuser_id', 'kind'),
+            whitelist.filter(to_customuser_id=user_id).annotate(kind=Value(2)).values_list('from_customuser_id', 'kind'),
+            all=True,
+        )
+        for other_id, kind in rows:
+            lists[kind].append(other_id)
+        return ACLEntry(
+            blacklist=_sorted_ids(lists[0]),
+            blacklisted_by=_sorted_ids(lists[1]),
+            whitelisted_by=_sorted_ids(lists[2]),
+            version=version,
+        )
+
+    def _cached(self, user_id, version):
+        """(запись или None, поколение на момент промаха)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if (
+                entry is not None and time.monotonic() - entry.loaded_at < self.ttl
+                and (version is UNCHECKED or entry.version == version)
+            ):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry, None
+            self.misses += 1
+            return None, self._generation
+
+    def _store(self, user_id, entry, generation):
+        with self._lock:
+            # Списки изменились во время загрузки — не кэшируем устаревшие данные
+            if generation != self._generation:
+                return
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def entry(self, user_id, version=UNCHECKED):
+        """
+        Списки пользователя, при отсутствии в памяти — загрузка из БД.
+        version — lists_changed_at пользователя: запись другой версии перечитывается
+        """
+        entry, generation = self._cached(user_id, version)
+        if entry is None:
+            entry = self._load(user_id, version)
+            self._store(user_id, entry, generation)
+        return entry
+
+    def user_entry(self, user):
+        """Списки пользователя с проверкой версии по его lists_changed_at"""
+        return self.entry(user.id, user.lists_changed_at)
+
+    def is_blocked(self, viewer_id, author_id):
+        """Взаимная блокировка: зритель в черном списке автора или автор в черном списке зрителя"""
+        entry = self.entry(viewer_id)
+        return _contains(entry.blacklisted_by, author_id) or _contains(entry.blacklist, author_id)
+
+    def is_blacklisted_by(self, viewer_id, author_id):
+        """Зритель находится в черном списке автора"""
+        return self.entry(viewer_id).is_blacklisted_by(author_id)
+
+    def is_whitelisted_by(self, viewer_id, author_id):
+        """Зритель находится в белом списке автора"""
+        return self.entry(viewer_id).is_whitelisted_by(author_id)
+
+    def can_view(self, viewer_id, author_id, is_private):
+        """Может ли зритель видеть блог автора с учетом приватности и списков"""
+        if viewer_id == author_id:
+            return True
+        if self.is_blocked(viewer_id, author_id):
+            return False
+        return not is_private or self.is_whitelisted_by(viewer_id, author_id)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Размер индекса и статистика попаданий"""
+        with self._lock:
+            entries = list(self._entries.values())
+            hits, misses = self.hits, self.misses
+        return {
+            'users': len(entries),
+            'max_users': self.max_users,
+            'ids': sum(len(e.blacklist) + len(e.blacklisted_by) + len(e.whitelisted_by) for e in entries),
+            'bytes': sum(e.nbytes() for e in entries),
+            'hits': hits,
+            'misses': misses,
+        }
+
+
+acl_graph = ACLGraph()
@@ -0,0 +1,146 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Окно неактивности, после которого сессия считается истекшей (секунды)
+INACTIVITY_WINDOW = 3600
+
+
+class ActivityBuffer:
+    """
+    Отложенная запись last_activity.
+    Отметки активности копятся в памяти процесса (последняя на пользователя)
+    и записываются пачкой через bulk_update (UPDATE ... CASE WHEN id = ...),
+    не чаще одного раза в ACTIVITY_MIN_WRITE_INTERVAL секунд на пользователя.
+    Сброс выполняет фоновый поток раз в ACTIVITY_FLUSH_INTERVAL секунд;
+    при ACTIVITY_FLUSH_INTERVAL = 0 — синхронно в момент отметки.
+    Последние отметки за час хранятся и после записи, чтобы проверка
+    неактивности не зависела от устаревших копий пользователя (кэш пользователей).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._latest = {}
+        self._written = {}
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'ACTIVITY_WRITE_BEHIND', True)
+
+    @property
+    def min_write_interval(self):
+        return getattr(settings, 'ACTIVITY_MIN_WRITE_INTERVAL', 60)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'ACTIVITY_FLUSH_INTERVAL', 5)
+
+    def touch(self, user):
+        """Отметка активности пользователя без немедленной записи в БД"""
+        now = timezone.now()
+        user.last_activity = now
+        with self._lock:
+            self._pending[user.pk] = now
+            self._latest[user.pk] = now
+
+        if self.flush_interval > 0:
+            self._ensure_flusher()
+        else:
+            self.flush()
+
+    def last_activity(self, user):
+        """Время активности с учетом еще не записанных отметок"""
+        with self._lock:
+            latest = self._latest.get(user.pk)
+        if latest is not None and latest > user.last_activity:
+            return latest
+        return user.last_activity
+
+    def _take_due(self, force):
+        now = time.monotonic()
+        due = {}
+        with self._lock:
+            for user_id, last_activity in list(self._pending.items()):
+                if force or now - self._written.get(user_id, 0) >= self.min_write_interval:
+                    due[user_id] = last_activity
+                    del self._pending[user_id]
+                    self._written[user_id] = now
+            # Отметки старше интервала больше не ограничивают запись
+            for user_id, written_at in list(self._written.items()):
+                if now - written_at >= self.min_write_interval and user_id not in due:
+                    del self._written[user_id]
+            # Отметки старше часа уже не влияют на проверку неактивности
+            expired = timezone.now() - timedelta(seconds=INACTIVITY_WINDOW)
+            for user_id, last_activity in list(self._latest.items()):
+                if last_activity < expired and user_id not in self._pending:
+                    del self._latest[user_id]
+        return due
+
+    def flush(self, force=False):
+        """Запись накопленных отметок, у которых истек минимальный интервал"""
+        due = self._take_due(force)
+        if not due:
+            return 0
+        User = get_user_model()
+        try:
+            User.objects.bulk_update(
+                [User(pk=user_id, last_activity=last_activity) for user_id, last_activity in due.items()],
+                ['last_activity'],
+                batch_size=500
+            )
+        except Exception:
+            # Возвращаем отметки в буфер, более свежие не затираем
+            with self._lock:
+                for user_id, last_activity in due.items():
+                    pending = self._pending.get(user_id)
+                    if pending is None or pending < last_activity:
+                        self._pending[user_id] = last_activity
+                    self._written.pop(user_id, None)
+            raise
+        return len(due)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # Поток создается лениво — после fork воркера gunicorn, а не в мастер-процессе
+            self._thread = threading.Thread(target=self._run, name='activity-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать время активности пользователей')
+            finally:
+                close_old_connections()
+
+
+activity_buffer = ActivityBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        activity_buffer.flush(force=True)
+    except Exception:
+        logger.exception('Не удалось записать время активности при завершении процесса')
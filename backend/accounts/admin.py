@@ -1,6 +1,26 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .lists import send_list_changed
+from .models import BlacklistEntry, CustomUser, WhitelistEntry
+
+
+class ListEntryInline(admin.TabularInline):
+    fk_name = 'from_customuser'
+    raw_id_fields = ('to_customuser',)
+    extra = 0
+
+
+class BlacklistInline(ListEntryInline):
+    model = BlacklistEntry
+    verbose_name = verbose_name_plural = 'Черный список'
+
+
+class WhitelistInline(ListEntryInline):
+    model = WhitelistEntry
+    verbose_name = verbose_name_plural = 'Белый список'
+
+
+LIST_INLINE_TYPES = {BlacklistEntry: 'blacklist', WhitelistEntry: 'whitelist'}
 
 
 @admin.register(CustomUser)
@@ -12,9 +32,10 @@ class CustomUserAdmin(UserAdmin):
     
     fieldsets = UserAdmin.fieldsets + (
         ('Дополнительная информация', {
-            'fields': ('role', 'blacklist', 'whitelist', 'last_activity')
+            'fields': ('role', 'last_activity')
         }),
     )
+    inlines = [BlacklistInline, WhitelistInline]
     
     actions = ['promote_to_moderator', 'demote_to_user']
     
@@ -34,6 +55,21 @@ class CustomUserAdmin(UserAdmin):
         self.message_user(request, "Выбранные модераторы понижены до пользователей")
     demote_to_user.short_description = "Снять права модераторов"
     
+    def save_formset(self, request, form, formset, change):
+        """Строки списков сохраняются без m2m_changed — сигнал отправляется вручную"""
+        list_type = LIST_INLINE_TYPES.get(formset.model)
+        if list_type is None:
+            return super().save_formset(request, form, formset, change)
+        removed = {
+            inline_form.initial['to_customuser'] for inline_form in formset.initial_forms
+            if inline_form in formset.deleted_forms or 'to_customuser' in inline_form.changed_data
+        }
+        super().save_formset(request, form, formset, change)
+        added = {entry.to_customuser_id for entry in formset.new_objects}
+        added.update(entry.to_customuser_id for entry, _ in formset.changed_objects)
+        send_list_changed(form.instance, list_type, 'post_remove', removed - added)
+        send_list_changed(form.instance, list_type, 'post_add', added - removed)
+
     def get_readonly_fields(self, request, obj=None):
         if obj and not request.user.is_superuser:
             return ('role',) + self.readonly_fields
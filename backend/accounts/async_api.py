@@ -0,0 +1,61 @@
+import io
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.settings import api_settings
+
+from .authentication import JWTAuthentication
+
+
+def api_response(data, status=200, headers=None):
+    """Ответ в формате DRF: тот же рендерер, что у синхронных APIView"""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(
+        renderer.render(data), status=status, headers=headers,
+        content_type=f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+    )
+
+
+def request_data(request):
+    """Тело JSON-запроса тем же парсером, что у синхронных APIView (ошибка — ParseError)"""
+    if not request.body:
+        return {}
+    parser = api_settings.DEFAULT_PARSER_CLASSES[0]()
+    return parser.parse(io.BytesIO(request.body), parser_context={'request': request})
+
+
+class AsyncAPIView(View):
+    """
+    Базовое асинхронное представление для ASGI без DRF APIView
+    (DRF вызывает обработчики синхронно, под ASGI — в отдельном потоке).
+    JWT-аутентификация выполняется асинхронно (JWTAuthentication.aauthenticate),
+    ошибки DRF (APIException) и Http404 превращаются в ответы того же формата.
+    Обработчики — только async def.
+    """
+    authentication = JWTAuthentication()
+    require_authentication = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Как у DRF APIView: сессионной аутентификации нет, CSRF-проверка не нужна
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await self.authentication.aauthenticate(request)
+            request.user, request.auth = result if result else (AnonymousUser(), None)
+            if self.require_authentication and not request.user.is_authenticated:
+                raise NotAuthenticated()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            # JWTAuthentication не задает WWW-Authenticate, поэтому DRF отвечает 403
+            status = 403 if exc.status_code == 401 else exc.status_code
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            # Как в rest_framework.views.exception_handler
+            headers = {'Retry-After': '%d' % exc.wait} if getattr(exc, 'wait', None) else None
+            return api_response(detail, status=status, headers=headers)
+        except Http404 as exc:
+            return api_response({'detail': str(exc)}, status=404)
@@ -5,53 +5,89 @@ from rest_framework import authentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils import timezone
 from datetime import timedelta
+from backend.metrics import auth_outcomes
+from .token_cache import token_cache
+from .user_cache import user_cache
 
 
 class JWTAuthentication(authentication.BaseAuthentication):
     """
     Кастомная JWT аутентификация
     """
-    def authenticate(self, request):
+    def get_token(self, request):
         # Сначала пробуем взять токен из заголовка
         auth_header = request.META.get('HTTP_AUTHORIZATION') or request.headers.get('Authorization')
-        token = None
         if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-        else:
-            # Если нет заголовка, пробуем взять токен из cookie
-            token = request.COOKIES.get('access_token')
+            return auth_header.split(' ')[1]
+        # Если нет заголовка, пробуем взять токен из cookie
+        return request.COOKIES.get('access_token')
+
+    def fail(self, outcome, message):
+        auth_outcomes.inc(outcome)
+        return AuthenticationFailed(message)
+
+    def get_payload(self, token):
+        try:
+            payload = token_cache.decode(token)
+        except jwt.ExpiredSignatureError:
+            raise self.fail('expired', 'Токен истек')
+        except jwt.InvalidTokenError:
+            raise self.fail('invalid', 'Неверный токен')
+
+        # Проверяем expiration токена
+        if int(payload['exp']) < int(timezone.now().timestamp()):
+            raise self.fail('expired', 'Токен истек')
+        return payload
+
+    def authenticate(self, request):
+        token = self.get_token(request)
         if not token:
+            auth_outcomes.inc('anonymous')
             return None
 
+        payload = self.get_payload(token)
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            
-            # Проверяем expiration токена
-            if int(payload['exp']) < int(timezone.now().timestamp()):
-                raise AuthenticationFailed('Токен истек')
-            
-            user = get_user_model().objects.get(id=payload['user_id'])
+            user = user_cache.get(payload['user_id'])
             
             # Проверяем активность пользователя
             if not self.is_active_user(user):
-                raise AuthenticationFailed('Сессия истекла из-за неактивности')
+                raise self.fail('inactive', 'Сессия истекла из-за неактивности')
             
             # Обновляем время активности при каждом запросе
             self.update_user_activity(user)
+            auth_outcomes.inc('success')
             return (user, token)
             
-        except jwt.ExpiredSignatureError:
-            raise AuthenticationFailed('Токен истек')
-        except jwt.InvalidTokenError:
-            raise AuthenticationFailed('Неверный токен')
         except get_user_model().DoesNotExist:
-            raise AuthenticationFailed('Пользователь не найден')
+            raise self.fail('not_found', 'Пользователь не найден')
+
+    async def aauthenticate(self, request):
+        """authenticate() для асинхронных представлений (django.http.HttpRequest)"""
+        token = self.get_token(request)
+        if not token:
+            auth_outcomes.inc('anonymous')
+            return None
+
+        payload = self.get_payload(token)
+        try:
+            user = await user_cache.aget(payload['user_id'])
+        except get_user_model().DoesNotExist:
+            raise self.fail('not_found', 'Пользователь не найден')
+
+        if not self.is_active_user(user):
+            raise self.fail('inactive', 'Сессия истекла из-за неактивности')
+        await user.aupdate_activity()
+        auth_outcomes.inc('success')
+        return (user, token)
 
     def is_active_user(self, user):
         """Проверяет, активен ли пользователь (была ли активность в течение часа)"""
         if not hasattr(user, 'last_activity'):
             return True  # Если поля нет, считаем пользователя активным
-        
+
+        if hasattr(user, 'is_active_user'):
+            return user.is_active_user()  # Учитывает отложенные отметки активности
+
         return (timezone.now() - user.last_activity).total_seconds() < 3600
 
     def update_user_activity(self, user):
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashing import password_hasher
+
+
+class EmailBackend(ModelBackend):
+    """
+    Аутентификация по email и паролю за один запрос к БД.
+    Для неизвестного email пароль все равно хэшируется, чтобы время ответа
+    не выдавало, зарегистрирован ли адрес (как в ModelBackend).
+    Хэширование — под лимитом accounts.hashing.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        UserModel = get_user_model()
+        user = UserModel._default_manager.filter(email=email).first()
+        if user is None:
+            password_hasher.make_password(password)
+            return None
+        if password_hasher.check_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, email=None, password=None, **kwargs):
+        """authenticate() на асинхронной ORM, хэширование в пуле accounts.hashing"""
+        if email is None or password is None:
+            return None
+        UserModel = get_user_model()
+        user = await UserModel._default_manager.filter(email=email).afirst()
+        if user is None:
+            await password_hasher.amake_password(password)
+            return None
+        if await password_hasher.acheck_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import Throttled
+
+
+class PasswordHashBusy(Throttled):
+    """Все слоты хэширования заняты — ответ 429 с Retry-After"""
+    default_detail = 'Сервер перегружен.'
+    extra_detail_singular = extra_detail_plural = 'Повторите попытку через {wait} с.'
+
+    def __init__(self):
+        super().__init__(wait=1)
+
+
+def _check_password(raw_password, encoded):
+    """(пароль верен, новый хэш при устаревшем алгоритме или None)"""
+    if not hashers.check_password(raw_password, encoded):
+        return False, None
+    # Та же проверка, что в django.contrib.auth.hashers.check_password
+    preferred = hashers.get_hasher('default')
+    if hashers.identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, hashers.make_password(raw_password)
+    return True, None
+
+
+class PasswordHasher:
+    """
+    Ограничение числа одновременных хэширований паролей в процессе.
+    PBKDF2 (hashlib) отпускает GIL, поэтому синхронные представления хэшируют
+    в своем потоке, а ограничивается число потоков, занятых хэшированием:
+    PASSWORD_HASH_CONCURRENCY меньше числа потоков воркера, и свободные потоки
+    остаются дешевым запросам. Сверх лимита запрос сразу получает
+    PasswordHashBusy (429), а не ждет в очереди. Асинхронные представления
+    хэшируют в пуле потоков того же размера под тем же лимитом.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def concurrency(self):
+        return getattr(settings, 'PASSWORD_HASH_CONCURRENCY', 2)
+
+    def _acquire(self):
+        with self._lock:
+            if self.in_flight >= self.concurrency:
+                self.rejected += 1
+                raise PasswordHashBusy()
+            self.in_flight += 1
+
+    def _release(self, *args):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _pool(self):
+        with self._lock:
+            # Пул создается лениво в каждом процессе (после fork воркера)
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix='password-hash'
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        self._acquire()
+        try:
+            return func(*args)
+        finally:
+            self._release()
+
+    async def _arun(self, func, *args):
+        self._acquire()
+        try:
+            future = self._pool().submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Слот освобождается по завершении хэширования, даже если запрос отменен
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def make_password(self, raw_password):
+        return self._run(hashers.make_password, raw_password)
+
+    async def amake_password(self, raw_password):
+        return await self._arun(hashers.make_password, raw_password)
+
+    def check_password(self, raw_password, encoded):
+        """(пароль верен, новый хэш или None) — новый хэш нужно сохранить"""
+        return self._run(_check_password, raw_password, encoded)
+
+    async def acheck_password(self, raw_password, encoded):
+        return await self._arun(_check_password, raw_password, encoded)
+
+    def set_password(self, user, raw_password):
+        """
+        user.set_password() под лимитом: пароль запоминается в user._password,
+        и save() вызывает password_changed для валидаторов паролей
+        """
+        user.password = self.make_password(raw_password)
+        user._password = raw_password
+
+    async def aset_password(self, user, raw_password):
+        user.password = await self.amake_password(raw_password)
+        user._password = raw_password
+
+    def check_user_password(self, user, raw_password):
+        """Проверка пароля пользователя с сохранением обновленного хэша"""
+        valid, upgraded = self.check_password(raw_password, user.password)
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        return valid
+
+    async def acheck_user_password(self, user, raw_password):
+        valid, upgraded = await self.acheck_password(raw_password, user.password)
+        if upgraded:
+            user.password = upgraded
+            await user.asave(update_fields=['password'])
+        return valid
+
+    def stats(self):
+        with self._lock:
+            return {
+                'concurrency': self.concurrency,
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+            }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,175 @@
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+from rest_framework.exceptions import ValidationError
+
+from blogs.utils import decode_cursor, encode_cursor
+from .models import CustomUser
+
+LIST_TYPES = ('blacklist', 'whitelist')
+
+# Размер страницы списка пользователей
+LIST_PAGE_SIZE = 50
+
+# Поля пользователя в списках (как в UserListSerializer) и их пути в промежуточной таблице
+LIST_FIELDS = {
+    'id': 'to_customuser_id',
+    'username': 'to_customuser__username',
+    'email': 'to_customuser__email',
+    'role': 'to_customuser__role',
+}
+
+
+def _through(list_type):
+    return getattr(CustomUser, list_type).through
+
+
+def _opposite(list_type):
+    return 'whitelist' if list_type == 'blacklist' else 'blacklist'
+
+
+def _current_ids(owner, list_type, ids):
+    if not ids:
+        return set()
+    return set(
+        _through(list_type).objects
+        .filter(from_customuser_id=owner.pk, to_customuser_id__in=ids)
+        .values_list('to_customuser_id', flat=True)
+    )
+
+
+def send_list_changed(owner, list_type, action, pk_set):
+    """
+    bulk_create, delete() по промежуточной таблице и inline-формы админки не отправляют
+    m2m_changed, поэтому сигнал отправляется вручную — так же, как его отправляет add()/remove().
+    Обработчики сбрасывают индекс списков, кэш лент и пересчитывают хронологии.
+    """
+    if not pk_set:
+        return
+    m2m_changed.send(
+        sender=_through(list_type), instance=owner, action=action, reverse=False,
+        model=CustomUser, pk_set=pk_set, using=router.db_for_write(CustomUser, instance=owner),
+    )
+
+
+def apply_bulk_list_changes(owner, changes):
+    """
+    Массовое изменение черного и белого списков владельца в одной транзакции.
+    changes — {'blacklist': {'add': [...], 'remove': [...]}, 'whitelist': {...}}.
+    Добавление в список удаляет пользователя из противоположного, как и в
+    ListManagementView. Возвращает результат по каждому id:
+    added, exists, removed, absent, not_found, self.
+    """
+    requested = {
+        user_id
+        for list_type in LIST_TYPES
+        for action in ('add', 'remove')
+        for user_id in changes[list_type][action]
+    }
+    existing = set(CustomUser.objects.filter(id__in=requested).values_list('id', flat=True))
+
+    results = {list_type: {'add': {}, 'remove': {}} for list_type in LIST_TYPES}
+    to_add = {}
+    to_remove = {}
+    for list_type in LIST_TYPES:
+        for action in ('add', 'remove'):
+            valid = []
+            for user_id in dict.fromkeys(changes[list_type][action]):
+                if user_id == owner.pk:
+                    results[list_type][action][user_id] = 'self'
+                elif user_id not in existing:
+                    results[list_type][action][user_id] = 'not_found'
+                else:
+                    # Статус проставляется после записи, порядок ответа — как в запросе
+                    results[list_type][action][user_id] = None
+                    valid.append(user_id)
+            (to_add if action == 'add' else to_remove)[list_type] = valid
+
+    added = {}
+    removed = {}
+    with transaction.atomic():
+        for list_type in LIST_TYPES:
+            # Из списка удаляются явно указанные и добавляемые в противоположный список
+            candidates = set(to_remove[list_type]) | set(to_add[_opposite(list_type)])
+            present = _current_ids(owner, list_type, candidates)
+            if present:
+                _through(list_type).objects.filter(
+                    from_customuser_id=owner.pk, to_customuser_id__in=present
+                ).delete()
+            removed[list_type] = present
+            for user_id in to_remove[list_type]:
+                results[list_type]['remove'][user_id] = 'removed' if user_id in present else 'absent'
+
+        for list_type in LIST_TYPES:
+            present = _current_ids(owner, list_type, to_add[list_type])
+            new_ids = [user_id for user_id in to_add[list_type] if user_id not in present]
+            through = _through(list_type)
+            through.objects.bulk_create(
+                [through(from_customuser_id=owner.pk, to_customuser_id=user_id) for user_id in new_ids],
+                ignore_conflicts=True,
+            )
+            added[list_type] = set(new_ids)
+            for user_id in to_add[list_type]:
+                results[list_type]['add'][user_id] = 'exists' if user_id in present else 'added'
+
+        for list_type in LIST_TYPES:
+            send_list_changed(owner, list_type, 'post_remove', removed[list_type])
+            send_list_changed(owner, list_type, 'post_add', added[list_type])
+
+    return {
+        list_type: {
+            action: [{'id': user_id, 'status': result} for user_id, result in items.items()]
+            for action, items in actions.items()
+        }
+        for list_type, actions in results.items()
+    }
+
+
+def parse_list_fields(value):
+    """Разбор ?fields=id,username; без параметра — все поля UserListSerializer"""
+    if not value:
+        return list(LIST_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in LIST_FIELDS]
+    if unknown or not fields:
+        raise ValidationError({'fields': f'Допустимые поля: {", ".join(LIST_FIELDS)}'})
+    return fields
+
+
+def _list_rows(owner, list_type):
+    return _through(list_type).objects.filter(from_customuser_id=owner.pk).order_by('-id')
+
+
+def in_list(owner, list_type, user_id):
+    """Есть ли пользователь в списке владельца — один запрос по индексу, без загрузки списка"""
+    return _list_rows(owner, list_type).filter(to_customuser_id=user_id).exists()
+
+
+def list_page(owner, list_type, cursor=None, fields=None, per_page=LIST_PAGE_SIZE):
+    """
+    Страница списка владельца: keyset-пагинация по id строки промежуточной
+    таблицы (новые записи первыми) и проекция values() без создания моделей.
+    Стоимость запроса не зависит от длины списка.
+    """
+    fields = fields or list(LIST_FIELDS)
+    rows = _list_rows(owner, list_type)
+    if cursor:
+        rows = rows.filter(id__lt=decode_cursor(cursor))
+    # Имена полей пользователя совпадают с полями промежуточной таблицы (id),
+    # поэтому выбираются кортежи и переименовываются при сборке словарей
+    rows = list(rows.values_list('id', *(LIST_FIELDS[name] for name in fields))[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][0])
+    return [dict(zip(fields, row[1:])) for row in rows], next_cursor
+
+
+def list_export_rows(owner, list_type, chunk_size, fields=None):
+    """
+    Весь список владельца в порядке list_page() для потоковой выгрузки:
+    строки читаются из курсора БД пачками по chunk_size
+    """
+    fields = fields or list(LIST_FIELDS)
+    rows = _list_rows(owner, list_type).values_list(*(LIST_FIELDS[name] for name in fields))
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(fields, row))
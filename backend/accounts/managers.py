@@ -1,20 +1,33 @@
 from django.contrib.auth.models import BaseUserManager
 
+from .hashing import password_hasher
+
 
 # Менеджер для создания пользователей
 class CustomUserManager(BaseUserManager):
-    def create_user(self, username, email, password=None, **extra_fields):
+    def _build_user(self, username, email, **extra_fields):
         if not email:
             raise ValueError('Email обязателен')
         if not username:
             raise ValueError('Username обязателен')
 
         email = self.normalize_email(email)
-        user = self.model(username=username, email=email, **extra_fields)
-        user.set_password(password)
+        return self.model(username=username, email=email, **extra_fields)
+
+    def create_user(self, username, email, password=None, **extra_fields):
+        user = self._build_user(username, email, **extra_fields)
+        # Хэширование под лимитом accounts.hashing
+        password_hasher.set_password(user, password)
         user.save(using=self._db)
         return user
 
+    async def acreate_user(self, username, email, password=None, **extra_fields):
+        """create_user() для асинхронной регистрации"""
+        user = self._build_user(username, email, **extra_fields)
+        await password_hasher.aset_password(user, password)
+        await user.asave(using=self._db)
+        return user
+
     def create_superuser(self, username, email, password=None, **extra_fields):
         extra_fields.setdefault('role', 'SU')
         extra_fields.setdefault('is_staff', True)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='blog_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество блогов'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='public_blog_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество публичных блогов'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def list_entry_state(name, table):
+    """Промежуточная таблица уже создана ManyToManyField в 0001 — модель только в состоянии"""
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.AutoField(primary_key=True, serialize=False, verbose_name='ID')),
+            ('from_customuser', models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL
+            )),
+            ('to_customuser', models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL
+            )),
+        ],
+        options={
+            'db_table': table,
+            'unique_together': {('from_customuser', 'to_customuser')},
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_blog_counters'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                list_entry_state('BlacklistEntry', 'accounts_customuser_blacklist'),
+                list_entry_state('WhitelistEntry', 'accounts_customuser_whitelist'),
+                migrations.AlterField(
+                    model_name='customuser',
+                    name='blacklist',
+                    field=models.ManyToManyField(
+                        blank=True, related_name='blacklisted_by', through='accounts.BlacklistEntry',
+                        through_fields=('from_customuser', 'to_customuser'), to=settings.AUTH_USER_MODEL,
+                        verbose_name='Черный список'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='customuser',
+                    name='whitelist',
+                    field=models.ManyToManyField(
+                        blank=True, related_name='whitelisted_by', through='accounts.WhitelistEntry',
+                        through_fields=('from_customuser', 'to_customuser'), to=settings.AUTH_USER_MODEL,
+                        verbose_name='Белый список'
+                    ),
+                ),
+            ],
+        ),
+        # Обратное направление (кто занес пользователя в список) читается индексом (to, from)
+        migrations.AddIndex(
+            model_name='blacklistentry',
+            index=models.Index(fields=['to_customuser', 'from_customuser'], name='blacklist_to_from_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='whitelistentry',
+            index=models.Index(fields=['to_customuser', 'from_customuser'], name='whitelist_to_from_idx'),
+        ),
+    ]
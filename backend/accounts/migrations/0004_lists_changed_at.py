@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_list_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='lists_changed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Изменение списков'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+def mark_timelines(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Timeline = apps.get_model('blogs', 'Timeline')
+    CustomUser.objects.filter(id__in=Timeline.objects.values('viewer_id')).update(has_timeline=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_lists_changed_at'),
+        ('blogs', '0002_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='has_timeline',
+            field=models.BooleanField(default=False, verbose_name='Материализованная лента'),
+        ),
+        migrations.RunPython(mark_timelines, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,10 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import EmailValidator
 from django.utils import timezone
 from .managers import CustomUserManager  # <-- Import your manager
+from .activity import INACTIVITY_WINDOW, activity_buffer
 
 # Создание кастомного класса пользователя
 class CustomUser(AbstractUser):
@@ -25,6 +27,8 @@ class CustomUser(AbstractUser):
     blacklist = models.ManyToManyField(
         'self',
         symmetrical=False,
+        through='BlacklistEntry',
+        through_fields=('from_customuser', 'to_customuser'),
         related_name='blacklisted_by',
         blank=True,
         verbose_name='Черный список'
@@ -32,6 +36,8 @@ class CustomUser(AbstractUser):
     whitelist = models.ManyToManyField(
         'self',
         symmetrical=False,
+        through='WhitelistEntry',
+        through_fields=('from_customuser', 'to_customuser'),
         related_name='whitelisted_by',
         blank=True,
         verbose_name='Белый список'
@@ -45,6 +51,27 @@ class CustomUser(AbstractUser):
         default=timezone.now, 
         verbose_name='Дата регистрации'
     )
+
+    # Денормализованные счетчики блогов (обновляются сигналами blogs через F-выражения)
+    blog_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество блогов'
+    )
+    public_blog_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество публичных блогов'
+    )
+    # Меняется при изменении черного/белого списка пользователя или списков, где он указан
+    lists_changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Изменение списков'
+    )
+    # Построена материализованная лента (blogs.timeline); читается вместе с пользователем
+    has_timeline = models.BooleanField(
+        default=False,
+        verbose_name='Материализованная лента'
+    )
     
     # Устанавливаю кастомного менеджера
     objects = CustomUserManager()
@@ -85,14 +112,31 @@ class CustomUser(AbstractUser):
             return True
         return False
     
+    def save(self, *args, **kwargs):
+        # Пользователь из accounts.user_cache загружен не полностью и может быть устаревшим
+        if getattr(self, '_from_user_cache', False) and kwargs.get('update_fields') is None:
+            raise ValueError('Пользователь из кэша аутентификации сохраняется только с update_fields')
+        super().save(*args, **kwargs)
+
     def update_activity(self):
-        """Обновляет время последней активности"""
+        """Обновляет время последней активности (запись в БД отложенная, см. accounts.activity)"""
+        if activity_buffer.enabled:
+            activity_buffer.touch(self)
+            return
         self.last_activity = timezone.now()
         self.save(update_fields=['last_activity'])
 
+    async def aupdate_activity(self):
+        """update_activity() для асинхронных представлений"""
+        if activity_buffer.enabled and activity_buffer.flush_interval > 0:
+            # Отметка только в памяти, запись выполняет фоновый поток
+            activity_buffer.touch(self)
+            return
+        await sync_to_async(self.update_activity)()
+
     def is_active_user(self):
-        """Проверяет, активен ли пользователь"""
-        return (timezone.now() - self.last_activity).total_seconds() < 3600
+        """Проверяет, активен ли пользователь (с учетом еще не записанной активности)"""
+        return (timezone.now() - activity_buffer.last_activity(self)).total_seconds() < INACTIVITY_WINDOW
 
 
     def __str__(self):
@@ -103,3 +147,31 @@ class CustomUser(AbstractUser):
         
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+
+
+class ListEntry(models.Model):
+    """
+    Строка черного или белого списка: промежуточная таблица ManyToManyField
+    (таблицы созданы как автоматические, см. миграцию 0003)
+    """
+    id = models.AutoField(primary_key=True, verbose_name='ID')
+    from_customuser = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    to_customuser = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        abstract = True
+
+
+class BlacklistEntry(ListEntry):
+    class Meta:
+        db_table = 'accounts_customuser_blacklist'
+        unique_together = [['from_customuser', 'to_customuser']]
+        # Прямое направление покрыто уникальным индексом, обратное (кто занес пользователя в список) — этим
+        indexes = [models.Index(fields=['to_customuser', 'from_customuser'], name='blacklist_to_from_idx')]
+
+
+class WhitelistEntry(ListEntry):
+    class Meta:
+        db_table = 'accounts_customuser_whitelist'
+        unique_together = [['from_customuser', 'to_customuser']]
+        indexes = [models.Index(fields=['to_customuser', 'from_customuser'], name='whitelist_to_from_idx')]
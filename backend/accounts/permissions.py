@@ -1,16 +1,101 @@
+from collections import namedtuple
+
 from rest_framework import permissions
 
+# Название группы модераторов (роль MO дает те же права)
+MODERATOR_GROUP = 'moderator'
+
+
+class Capabilities(namedtuple('Capabilities', ['is_authenticated', 'is_superuser', 'is_moderator'])):
+    """Эффективные права пользователя, вычисляются один раз на запрос"""
+
+    @property
+    def can_moderate(self):
+        """Админ или модератор: видит все блоги, удаляет чужие"""
+        return self.is_superuser or self.is_moderator
+
+
+ANONYMOUS = Capabilities(is_authenticated=False, is_superuser=False, is_moderator=False)
+
+
+def _build_capabilities(user, is_moderator):
+    capabilities = Capabilities(
+        is_authenticated=True,
+        is_superuser=bool(user.is_superuser),
+        is_moderator=is_moderator
+    )
+    user._capabilities = capabilities
+    return capabilities
+
+
+def _known_capabilities(user):
+    """Права без запроса к БД; None — нужна проверка группы модераторов в БД"""
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS
+    capabilities = getattr(user, '_capabilities', None)
+    if capabilities is not None:
+        return capabilities
+
+    is_moderator = getattr(user, 'role', None) == 'MO'
+    if is_moderator or user.is_superuser:
+        return _build_capabilities(user, is_moderator)
+    group_names = getattr(user, '_cached_group_names', None)
+    if group_names is None:
+        return None
+    return _build_capabilities(user, MODERATOR_GROUP in group_names)
+
+
+def _moderator_group(user):
+    return user.groups.filter(name=MODERATOR_GROUP)
+
+
+def resolve_capabilities(user):
+    """
+    Права пользователя: суперпользователь, модератор по роли MO или по группе.
+    Группы берутся из кэша пользователя (accounts.user_cache), запрос к БД —
+    только если их там нет; результат сохраняется на объекте пользователя.
+    """
+    capabilities = _known_capabilities(user)
+    if capabilities is None:
+        capabilities = _build_capabilities(user, _moderator_group(user).exists())
+    return capabilities
+
+
+async def aresolve_capabilities(user):
+    """resolve_capabilities() для асинхронных представлений"""
+    capabilities = _known_capabilities(user)
+    if capabilities is None:
+        capabilities = _build_capabilities(user, await _moderator_group(user).aexists())
+    return capabilities
+
+
+def get_capabilities(request):
+    """Права текущего пользователя запроса (кэшируются на запросе)"""
+    capabilities = getattr(request, '_capabilities', None)
+    if capabilities is None:
+        capabilities = resolve_capabilities(getattr(request, 'user', None))
+        request._capabilities = capabilities
+    return capabilities
+
+
+async def aget_capabilities(request):
+    capabilities = getattr(request, '_capabilities', None)
+    if capabilities is None:
+        capabilities = await aresolve_capabilities(getattr(request, 'user', None))
+        request._capabilities = capabilities
+    return capabilities
+
 
 class IsSuperUser(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_superuser()
+        return get_capabilities(request).is_superuser
 
 
 class IsModerator(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_moderator()
+        return get_capabilities(request).is_moderator
 
 
 class IsUser(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_user()
\ No newline at end of file
+        return request.user.is_authenticated and request.user.is_user()
@@ -22,9 +22,18 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = CustomUser.objects.create_user(**validated_data)
+        password = validated_data.pop('password')
+        user = CustomUser.objects.create_user(password=password, **validated_data)
         return user
 
+    async def acreate(self):
+        """create() для асинхронной регистрации (после is_valid())"""
+        validated_data = dict(self.validated_data)
+        validated_data.pop('password_confirm')
+        password = validated_data.pop('password')
+        self.instance = await CustomUser.objects.acreate_user(password=password, **validated_data)
+        return self.instance
+
 
 class UserLoginSerializer(serializers.Serializer):
     """Сериализатор авторизации пользователя"""
@@ -38,6 +47,13 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ('username', 'email', 'first_name', 'last_name')
 
+    def update(self, instance, validated_data):
+        # Пользователь запроса может быть из кэша: остальные поля (счетчики) не перезаписываются
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """Сериализатор профиля пользователя"""
@@ -56,4 +72,30 @@ class UserListSerializer(serializers.ModelSerializer):
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
-    new_password = serializers.CharField(required=True)
\ No newline at end of file
+    new_password = serializers.CharField(required=True)
+
+
+# Максимум id в одном массиве массовой операции со списками
+BULK_LIST_LIMIT = 1000
+
+
+class ListChangesSerializer(serializers.Serializer):
+    """Добавление и удаление id в одном списке"""
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=BULK_LIST_LIMIT)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=BULK_LIST_LIMIT)
+
+
+class BulkListSerializer(serializers.Serializer):
+    """Сериализатор массового изменения черного и белого списков"""
+    blacklist = ListChangesSerializer(required=False)
+    whitelist = ListChangesSerializer(required=False)
+
+    def validate(self, attrs):
+        blacklist = attrs.setdefault('blacklist', {'add': [], 'remove': []})
+        whitelist = attrs.setdefault('whitelist', {'add': [], 'remove': []})
+        conflicts = set(blacklist['add']) & set(whitelist['add'])
+        if conflicts:
+            raise serializers.ValidationError(
+                {'conflicts': f'Нельзя добавить в оба списка: {sorted(conflicts)}'}
+            )
+        return attrs
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .acl import acl_graph
+from .activity import activity_buffer
+from .models import CustomUser
+from .user_cache import user_cache
+
+
+@receiver(m2m_changed, sender=CustomUser.blacklist.through)
+@receiver(m2m_changed, sender=CustomUser.whitelist.through)
+def invalidate_acl_on_list_change(sender, instance, action, pk_set, **kwargs):
+    """Сброс индекса списков при изменении черного или белого списка"""
+    if action in ('post_add', 'post_remove'):
+        acl_graph.invalidate(instance.pk, *(pk_set or ()))
+    elif action == 'post_clear':
+        acl_graph.clear()
+
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_acl_on_user_delete(sender, instance, **kwargs):
+    """Строки списков удаляются каскадно без m2m_changed"""
+    acl_graph.clear()
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_cache_on_save(sender, instance, update_fields=None, **kwargs):
+    """Смена роли, пароля, профиля; время активности учитывает activity_buffer"""
+    if update_fields and set(update_fields) == {'last_activity'} and activity_buffer.enabled:
+        return
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_cache_on_delete(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def invalidate_user_cache_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        user_cache.invalidate(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            user_cache.invalidate(user_id)
+    else:
+        # group.user_set.clear() не сообщает затронутых пользователей
+        user_cache.clear_local()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_user_cache_on_group_rename(sender, instance, created, **kwargs):
+    """Названия групп хранятся в записях кэша (общий кэш обновится по TTL)"""
+    if not created:
+        user_cache.clear_local()
@@ -0,0 +1,335 @@
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .acl import acl_graph
+from .activity import activity_buffer
+from .authentication import generate_jwt_token
+from .hashing import password_hasher
+from .lists import LIST_PAGE_SIZE, apply_bulk_list_changes
+from .models import CustomUser
+from .user_cache import user_cache
+from blogs.counters import touch_lists
+from blogs.models import Blog
+
+
+@override_settings(ACTIVITY_FLUSH_INTERVAL=0, ACTIVITY_MIN_WRITE_INTERVAL=0)
+class ProcessCacheTestCase(TestCase):
+    """
+    Процессные кэши переживают откат транзакции теста, а id в SQLite переиспользуются,
+    поэтому перед тестом кэши сбрасываются. Время активности пишется сразу,
+    без фонового потока, который пережил бы тестовую БД; отложенные отметки
+    записываются до отката, а не при выходе процесса.
+    """
+
+    def setUp(self):
+        acl_graph.clear()
+        user_cache.clear_local()
+        for cache in caches.all():
+            cache.clear()
+
+    def tearDown(self):
+        activity_buffer.flush(force=True)
+
+
+def create_user(name, **extra):
+    return CustomUser.objects.create_user(
+        username=name, email=f'{name}@example.com', password='Test-password-1', **extra
+    )
+
+
+class ACLGraphVersionTests(ProcessCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.viewer = create_user('viewer')
+
+    def whitelist_in_other_process(self):
+        """Изменение списка другим воркером: строки и версия в БД есть, сигнала в этом процессе нет"""
+        CustomUser.whitelist.through.objects.create(from_customuser=self.author, to_customuser=self.viewer)
+        CustomUser.objects.filter(id__in=[self.author.id, self.viewer.id]).update(lists_changed_at=timezone.now())
+
+    def test_entry_reloaded_when_lists_version_changes(self):
+        self.assertFalse(acl_graph.user_entry(self.viewer).is_whitelisted_by(self.author.id))
+        self.whitelist_in_other_process()
+        self.viewer.refresh_from_db()
+        self.assertTrue(acl_graph.user_entry(self.viewer).is_whitelisted_by(self.author.id))
+
+    def test_entry_cached_while_version_unchanged(self):
+        acl_graph.user_entry(self.viewer)
+        misses = acl_graph.stats()['misses']
+        acl_graph.user_entry(self.viewer)
+        self.assertEqual(acl_graph.stats()['misses'], misses)
+
+
+class UserCacheTests(ProcessCacheTestCase):
+    """Пользователь запроса берется из кэша и не должен затирать счетчики, измененные через update()"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.headers = {'Authorization': f'Bearer {generate_jwt_token(self.author)}'}
+
+    def request(self, method, url, data=None):
+        # Кэш сбрасывается после коммита; в TestCase коммита нет — колбэки выполняются явно
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.generic(
+                method, url, '' if data is None else json.dumps(data),
+                content_type='application/json', headers=self.headers
+            )
+
+    def create_blogs(self, count):
+        for number in range(count):
+            response = self.request('POST', '/api/blogs/feed/', {'title': f'blog-{number}', 'description': 'text'})
+            self.assertEqual(response.status_code, 201)
+
+    def test_profile_update_keeps_blog_counters(self):
+        self.request('GET', '/api/accounts/profile/')
+        self.create_blogs(3)
+        response = self.request('PUT', '/api/accounts/profile/', {'first_name': 'Author'})
+        self.assertEqual(response.status_code, 200)
+
+        self.author.refresh_from_db()
+        self.assertEqual((self.author.first_name, self.author.blog_count, self.author.public_blog_count), ('Author', 3, 3))
+        page = self.request('GET', f'/api/blogs/user/id/{self.author.id}/blogs/?page=1').json()
+        self.assertEqual((page['count'], len(page['results'])), (3, 3))
+        blog_id = page['results'][0]['id']
+        self.assertEqual(self.request('DELETE', '/api/blogs/feed/', {'blog_id': blog_id}).status_code, 200)
+
+    def test_password_change_keeps_blog_counters(self):
+        self.request('GET', '/api/accounts/profile/')
+        self.create_blogs(2)
+        response = self.request('POST', '/api/accounts/change-password/', {
+            'old_password': 'Test-password-1', 'new_password': 'Test-password-2'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.blog_count, 2)
+        self.assertTrue(self.author.check_password('Test-password-2'))
+
+    def test_list_change_evicts_cached_user(self):
+        self.assertIsNone(user_cache.get(self.author.id).lists_changed_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            touch_lists(self.author.id)
+        self.assertIsNotNone(user_cache.get(self.author.id).lists_changed_at)
+
+    def test_payload_limited_to_auth_fields(self):
+        user = user_cache.get(self.author.id)
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertNotIn('password', user_cache._local_get(self.author.id))
+        self.assertEqual((user.username, user.role, user.is_active), ('author', self.author.role, True))
+
+    def test_cached_user_saved_only_with_update_fields(self):
+        user = user_cache.get(self.author.id)
+        with self.assertRaises(ValueError):
+            user.save()
+        user.first_name = 'Stale'
+        user.save(update_fields=['first_name'])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.first_name, 'Stale')
+
+    def test_process_local_shared_level_ignored(self):
+        with override_settings(USER_CACHE_ALIAS='default'):
+            self.assertIsNone(user_cache.shared)
+
+
+class PasswordHashingTests(ProcessCacheTestCase):
+    """Синхронные и асинхронные представления с паролем: лимит хэширования и password_changed"""
+
+    def password_changed(self):
+        return mock.patch('django.contrib.auth.base_user.password_validation.password_changed')
+
+    def post(self, url, data, user=None):
+        headers = {'Authorization': f'Bearer {generate_jwt_token(user)}'} if user else {}
+        return self.client.post(url, data, content_type='application/json', headers=headers)
+
+    def test_registration(self):
+        for prefix in ('', 'async/'):
+            with self.subTest(prefix=prefix), self.password_changed() as password_changed:
+                name = f'newcomer{len(prefix)}'
+                response = self.post(f'/api/accounts/{prefix}register/', {
+                    'username': name, 'email': f'{name}@example.com',
+                    'password': 'Test-password-1', 'password_confirm': 'Test-password-1',
+                })
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.json()['user']['username'], name)
+                user = CustomUser.objects.get(username=name)
+                password_changed.assert_called_once_with('Test-password-1', user)
+                self.assertTrue(user.check_password('Test-password-1'))
+
+    def test_registration_duplicate_async(self):
+        create_user('author')
+        response = self.post('/api/accounts/async/register/', {
+            'username': 'author', 'email': 'other@example.com',
+            'password': 'Test-password-1', 'password_confirm': 'Test-password-1',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json())
+
+    def test_login(self):
+        create_user('author')
+        for prefix in ('', 'async/'):
+            with self.subTest(prefix=prefix):
+                url = f'/api/accounts/{prefix}login/'
+                response = self.post(url, {'email': 'author@example.com', 'password': 'Test-password-1'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['user']['username'], 'author')
+                self.assertIn('access_token', response.cookies)
+                response = self.post(url, {'email': 'author@example.com', 'password': 'wrong'})
+                self.assertEqual(response.status_code, 401)
+                response = self.post(url, {'email': 'nobody@example.com', 'password': 'Test-password-1'})
+                self.assertEqual(response.status_code, 401)
+
+    def test_change_password(self):
+        user = create_user('author')
+        for number, prefix in enumerate(('', 'async/'), start=1):
+            with self.subTest(prefix=prefix), self.password_changed() as password_changed:
+                new_password = f'Test-password-{number + 1}'
+                response = self.post(f'/api/accounts/{prefix}change-password/', {
+                    'old_password': f'Test-password-{number}', 'new_password': new_password
+                }, user)
+                self.assertEqual(response.status_code, 200)
+                password_changed.assert_called_once()
+                self.assertEqual(password_changed.call_args.args[0], new_password)
+                user.refresh_from_db()
+                self.assertTrue(user.check_password(new_password))
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=1)
+    def test_busy_slots_return_429(self):
+        create_user('author')
+        password_hasher._acquire()
+        try:
+            for prefix in ('', 'async/'):
+                with self.subTest(prefix=prefix):
+                    response = self.post(f'/api/accounts/{prefix}login/', {
+                        'email': 'author@example.com', 'password': 'Test-password-1'
+                    })
+                    self.assertEqual(response.status_code, 429)
+                    self.assertEqual(response['Retry-After'], '1')
+        finally:
+            password_hasher._release()
+        self.assertEqual(password_hasher.stats()['in_flight'], 0)
+        response = self.post('/api/accounts/async/login/', {'email': 'author@example.com', 'password': 'Test-password-1'})
+        self.assertEqual(response.status_code, 200)
+
+
+class ListMembershipTests(ProcessCacheTestCase):
+    """Проверка наличия в списке не зависит от размера первой страницы списка"""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user('owner')
+        self.headers = {'Authorization': f'Bearer {generate_jwt_token(self.owner)}'}
+
+    def in_list(self, list_type, user_id):
+        response = self.client.get(f'/api/accounts/lists/{list_type}/{user_id}/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['in_list']
+
+    def test_membership_beyond_first_page(self):
+        users = [create_user(f'listed-{number}') for number in range(LIST_PAGE_SIZE + 1)]
+        self.owner.blacklist.add(*users)
+        first_page = self.client.get('/api/accounts/lists/', headers=self.headers).json()['blacklist']
+        oldest = users[0]
+        self.assertNotIn(oldest.id, [row['id'] for row in first_page])
+        self.assertTrue(self.in_list('blacklist', oldest.id))
+        self.assertFalse(self.in_list('whitelist', oldest.id))
+
+    def test_unknown_list_type(self):
+        response = self.client.get(f'/api/accounts/lists/graylist/{self.owner.id}/', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkListTests(ProcessCacheTestCase):
+    """Массовое изменение списков: статусы по id, одна транзакция, сигнал m2m_changed"""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user('owner')
+        self.first, self.second, self.third = (create_user(name) for name in ('first', 'second', 'third'))
+        self.owner.whitelist.add(self.second)
+
+    def bulk(self, user, payload):
+        return self.client.post(
+            '/api/accounts/lists/bulk/', payload, content_type='application/json',
+            headers={'Authorization': f'Bearer {generate_jwt_token(user)}'}
+        )
+
+    def lists(self):
+        return (
+            set(self.owner.blacklist.values_list('id', flat=True)),
+            set(self.owner.whitelist.values_list('id', flat=True)),
+        )
+
+    def test_statuses(self):
+        first, second, third = self.first.id, self.second.id, self.third.id
+        response = self.bulk(self.owner, {
+            'blacklist': {'add': [first, second, self.owner.id, 999999, first], 'remove': [third]},
+            'whitelist': {'add': [third], 'remove': [first]},
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json(), {
+            'blacklist': {
+                # Повторный id — одна запись; second переносится из белого списка
+                'add': [
+                    {'id': first, 'status': 'added'}, {'id': second, 'status': 'added'},
+                    {'id': self.owner.id, 'status': 'self'}, {'id': 999999, 'status': 'not_found'},
+                ],
+                'remove': [{'id': third, 'status': 'absent'}],
+            },
+            'whitelist': {
+                'add': [{'id': third, 'status': 'added'}],
+                'remove': [{'id': first, 'status': 'absent'}],
+            },
+        })
+        self.assertEqual(self.lists(), ({first, second}, {third}))
+
+        response = self.bulk(self.owner, {'blacklist': {'add': [first], 'remove': [second]}})
+        self.assertEqual(response.json()['blacklist'], {
+            'add': [{'id': first, 'status': 'exists'}],
+            'remove': [{'id': second, 'status': 'removed'}],
+        })
+        self.assertEqual(self.lists(), ({first}, {third}))
+
+    def test_conflict(self):
+        response = self.bulk(self.owner, {
+            'blacklist': {'add': [self.first.id]}, 'whitelist': {'add': [self.first.id]},
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('conflicts', response.json())
+        self.assertEqual(self.lists(), (set(), {self.second.id}))
+
+    def test_rolled_back_on_error(self):
+        changes = {
+            'blacklist': {'add': [self.first.id, self.second.id], 'remove': []},
+            'whitelist': {'add': [self.third.id], 'remove': []},
+        }
+        with mock.patch('accounts.lists.send_list_changed', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                apply_bulk_list_changes(self.owner, changes)
+        self.assertEqual(self.lists(), (set(), {self.second.id}))
+
+    def test_signal_reaches_acl_and_feed(self):
+        Blog.objects.create(title='public', description='text', author=self.owner)
+        Blog.objects.create(title='secret', description='text', author=self.owner, is_private=True)
+        headers = {'Authorization': f'Bearer {generate_jwt_token(self.first)}'}
+
+        def feed():
+            response = self.client.get('/api/blogs/feed/?page=1', headers=headers)
+            return [row['title'] for row in response.json()['results']]
+
+        # Индекс списков и лента прогреты до изменения
+        self.assertEqual(feed(), ['public'])
+        self.assertFalse(acl_graph.user_entry(self.first).is_whitelisted_by(self.owner.id))
+
+        self.bulk(self.owner, {'whitelist': {'add': [self.first.id]}})
+        self.assertTrue(acl_graph.user_entry(self.first).is_whitelisted_by(self.owner.id))
+        self.assertEqual(feed(), ['secret', 'public'])
+
+        self.bulk(self.owner, {'blacklist': {'add': [self.first.id]}})
+        entry = acl_graph.user_entry(self.first)
+        self.assertEqual((entry.is_whitelisted_by(self.owner.id), entry.is_blacklisted_by(self.owner.id)), (False, True))
+        self.assertEqual(feed(), [])
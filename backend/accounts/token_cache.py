@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+
+
+class VerifiedTokenCache:
+    """
+    LRU уже проверенных JWT: ключ — SHA-256 от секрета и токена,
+    значение — расшифрованный payload и exp. Запись живет до exp токена,
+    после чего токен снова проходит полный jwt.decode (и получает ту же ошибку).
+    Ошибочные токены не кэшируются.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+        self.decode_seconds = 0.0
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_CACHE_SIZE', 10000)
+
+    def _key(self, token):
+        return hashlib.sha256(f'{settings.SECRET_KEY}\0{token}'.encode()).digest()
+
+    def decode(self, token):
+        """Аналог jwt.decode(token, SECRET_KEY, algorithms=['HS256']) с кэшем"""
+        if self.max_size <= 0:
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, exp = entry
+                if exp is None or exp > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(payload)
+                del self._entries[key]
+            self.misses += 1
+
+        started = time.perf_counter()
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+        elapsed = time.perf_counter() - started
+
+        exp = payload.get('exp')
+        with self._lock:
+            self.decodes += 1
+            self.decode_seconds += elapsed
+            self._entries[key] = (payload, float(exp) if exp is not None else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return dict(payload)
+
+    def revoke(self, *tokens):
+        """Удаление токенов из кэша (выход из системы)"""
+        keys = [self._key(token) for token in tokens if token]
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Попадания и оценка сэкономленного процессорного времени"""
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+            average = self.decode_seconds / self.decodes if self.decodes else 0.0
+        total = hits + misses
+        return {
+            'entries': size,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'avg_decode_us': round(average * 1e6, 2),
+            'cpu_saved_seconds': round(hits * average, 6),
+        }
+
+
+token_cache = VerifiedTokenCache()
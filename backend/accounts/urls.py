@@ -4,17 +4,23 @@ from . import views
 urlpatterns = [
     # Аутентификация
     path('register/', views.RegistrationView.as_view(), name='register'),
+    path('async/register/', views.AsyncRegistrationView.as_view(), name='register-async'),
     path('login/', views.LoginView.as_view(), name='login'),
+    path('async/login/', views.AsyncLoginView.as_view(), name='login-async'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
     path('token/refresh/', views.TokenRefreshView.as_view(), name='token-refresh'),
     
     # Профиль пользователя
     path('profile/', views.UserProfileView.as_view(), name='user-profile'),
     path('profile/<str:username>/', views.AuthorUserProfileView.as_view(), name='public-user-profile'),
+    path('async/profile/<str:username>/', views.AsyncAuthorUserProfileView.as_view(), name='public-user-profile-async'),
     path('profile/delete/', views.AccountManagementView.as_view(), name='delete-account'),
     
     # Управление списками
     path('lists/', views.UserListsView.as_view(), name='user-lists'),
+    path('lists/bulk/', views.BulkListManagementView.as_view(), name='bulk-lists'),
+    path('lists/<str:list_type>/', views.UserListPageView.as_view(), name='user-list-page'),
+    path('lists/<str:list_type>/export/', views.UserListExportView.as_view(), name='user-list-export'),
     path('lists/<str:list_type>/<int:user_id>/', views.ListManagementView.as_view(), name='add-to-list'),
     
     # Управление ролями (только для суперпользователей)
@@ -26,4 +32,5 @@ urlpatterns = [
     
     # Обновление пароля
     path('change-password/', views.ChangePasswordView.as_view(), name='password-reset-request'),
+    path('async/change-password/', views.AsyncChangePasswordView.as_view(), name='change-password-async'),
 ]
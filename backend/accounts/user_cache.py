@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from backend.caching import is_shared_cache
+
+# Версия формата записей: меняется при изменении набора полей пользователя
+CACHE_FORMAT_VERSION = 4
+
+# Поля, нужные аутентификации, правам и выбору запроса ленты; хэш пароля и профиль в кэш не попадают
+CACHED_FIELDS = (
+    'id', 'username', 'role', 'is_superuser', 'is_staff', 'is_active', 'last_activity', 'lists_changed_at',
+    'has_timeline',
+)
+
+
+class UserCache:
+    """
+    Кэш пользователей для аутентификации.
+    Первый уровень — LRU в памяти процесса с коротким TTL, второй — общий
+    Django cache (USER_CACHE_ALIAS, None — отключен). Хранятся только поля
+    CACHED_FIELDS и названия групп пользователя; пользователь восстанавливается
+    через from_db, остальные поля отложены (deferred) и читаются из БД при обращении.
+    Записи сбрасываются сигналами при сохранении, удалении и смене групп,
+    а также при изменении счетчиков и списков через update() (blogs.counters).
+    Пользователь из кэша может быть устаревшим: save() без update_fields для него
+    запрещен (CustomUser.save), где нужна вся строка — пользователь читается заново.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'USER_CACHE_ENABLED', True)
+
+    @property
+    def local_ttl(self):
+        return getattr(settings, 'USER_CACHE_LOCAL_TTL', 5)
+
+    @property
+    def local_size(self):
+        return getattr(settings, 'USER_CACHE_LOCAL_SIZE', 10000)
+
+    @property
+    def shared_ttl(self):
+        return getattr(settings, 'USER_CACHE_SHARED_TTL', 300)
+
+    @property
+    def shared(self):
+        """Общий уровень; LocMemCache у каждого процесса свой и не годится"""
+        alias = getattr(settings, 'USER_CACHE_ALIAS', None)
+        cache = caches[alias] if alias else None
+        return cache if cache is not None and is_shared_cache(cache) else None
+
+    def _key(self, user_id):
+        return f'auth:user:{CACHE_FORMAT_VERSION}:{user_id}'
+
+    def _fields(self):
+        # from_db ждет значения в порядке полей модели
+        return [field.attname for field in get_user_model()._meta.concrete_fields if field.attname in CACHED_FIELDS]
+
+    def _build(self, values):
+        fields = self._fields()
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, fields, [values[field] for field in fields])
+        user._from_user_cache = True
+        # Группы нужны для вычисления прав (accounts.permissions.resolve_capabilities)
+        user._cached_group_names = values['group_names']
+        return user
+
+    def _remember(self, user_id, values):
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self.local_ttl, values)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _local_get(self, user_id):
+        with self._lock:
+            cached = self._local.get(user_id)
+            if cached is not None and cached[0] > time.monotonic():
+                self._local.move_to_end(user_id)
+                self.hits += 1
+                return cached[1]
+        return None
+
+    def _shared_hit(self, user_id, values):
+        with self._lock:
+            self.shared_hits += 1
+        self._remember(user_id, values)
+
+    def _missing(self, user_id):
+        with self._lock:
+            self.misses += 1
+        User = get_user_model()
+        return (
+            User.objects.filter(id=user_id).values(*self._fields()),
+            User.groups.through.objects.filter(customuser_id=user_id).values_list('group__name', flat=True),
+        )
+
+    def get(self, user_id):
+        """Пользователь по id; DoesNotExist, если его нет"""
+        User = get_user_model()
+        if not self.enabled:
+            return User.objects.get(id=user_id)
+
+        values = self._local_get(user_id)
+        if values is not None:
+            return self._build(values)
+
+        shared = self.shared
+        values = shared.get(self._key(user_id)) if shared is not None else None
+        if values is not None:
+            self._shared_hit(user_id, values)
+            return self._build(values)
+
+        user_values, group_names = self._missing(user_id)
+        values = user_values.first()
+        if values is None:
+            raise User.DoesNotExist(f'Пользователь {user_id} не найден')
+        values['group_names'] = list(group_names)
+        if shared is not None:
+            shared.set(self._key(user_id), values, timeout=self.shared_ttl)
+        self._remember(user_id, values)
+        return self._build(values)
+
+    async def aget(self, user_id):
+        """
+        get() для асинхронной аутентификации: попадание в память процесса — без
+        перехода в поток, промах — get() целиком за один переход (async ORM и
+        async API кэша Django сами выполняют каждую операцию через sync_to_async)
+        """
+        values = self._local_get(user_id) if self.enabled else None
+        if values is not None:
+            return self._build(values)
+        return await sync_to_async(self.get)(user_id)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._local.pop(user_id, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete_many([self._key(user_id) for user_id in user_ids])
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'local_entries': len(self._local),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+            }
+
+
+user_cache = UserCache()
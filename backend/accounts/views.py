@@ -1,8 +1,10 @@
+from asgiref.sync import sync_to_async
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.contrib.auth import authenticate
+from django.contrib.auth import aauthenticate, authenticate
 from django.utils import timezone
+import hashlib
 import jwt
 from django.conf import settings
 from .models import CustomUser
@@ -12,17 +14,66 @@ from .serializers import (
     UserUpdateSerializer,
     UserProfileSerializer,
     UserListSerializer,
-    ChangePasswordSerializer
+    ChangePasswordSerializer,
+    BulkListSerializer
+)
+from .lists import (
+    LIST_FIELDS, LIST_TYPES, apply_bulk_list_changes, in_list, list_export_rows, list_page, parse_list_fields
 )
 from .authentication import generate_jwt_token, generate_refresh_token
+from .token_cache import token_cache
+from .hashing import password_hasher
+from .async_api import AsyncAPIView, api_response, request_data
+from backend.http import not_modified, set_validators
+from backend.streaming import export_chunk_size, ndjson_response
 from drf_yasg.utils import swagger_auto_schema
-from django.http import JsonResponse
+from drf_yasg import openapi
 from .utils import set_auth_cookies, delete_auth_cookies, get_refresh_token
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.serializers import ValidationError
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 
+LIST_FIELDS_PARAMETER = openapi.Parameter(
+    'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description=f"Поля пользователей через запятую: {', '.join(LIST_FIELDS)}"
+)
+
+
+def profile_etag(user):
+    """ETag профиля по значениям полей UserProfileSerializer, без сериализации"""
+    values = '|'.join(str(getattr(user, field)) for field in UserProfileSerializer.Meta.fields)
+    return f'"{hashlib.md5(values.encode()).hexdigest()}"'
+
+
+def registration_payload(user):
+    """Ответ регистрации (RegistrationView и AsyncRegistrationView)"""
+    return {
+        'message': 'Пользователь успешно зарегистрирован',
+        'access_token': generate_jwt_token(user),
+        'refresh_token': generate_refresh_token(user),
+        'user': UserProfileSerializer(user).data
+    }
+
+
+def login_payload(user):
+    """Ответ входа, access и refresh токены для cookies (LoginView и AsyncLoginView)"""
+    data = {
+        'message': 'Успешный вход',
+        'user': UserProfileSerializer(user).data
+    }
+    return data, generate_jwt_token(user), generate_refresh_token(user)
+
+
+def password_errors(password, user):
+    """Ошибки валидаторов пароля или None"""
+    try:
+        validate_password(password, user)
+    except (ValidationError, DjangoValidationError) as e:
+        return e.messages if hasattr(e, 'messages') else [str(e)]
+    return None
+
+
 class AuthView(APIView):
     """Базовый класс для аутентификации"""
     permission_classes = [permissions.AllowAny]
@@ -31,6 +82,7 @@ class AuthView(APIView):
 class RegistrationView(AuthView):
     """Предсталвение регистрации пользователя"""
     permission_classes = [permissions.AllowAny]
+    query_budget = 5
     
     @swagger_auto_schema(
         operation_description="Регистрация нового пользователя",
@@ -41,21 +93,28 @@ class RegistrationView(AuthView):
         if serializer.is_valid():
             user = serializer.save()
             user.update_activity() 
-            token = generate_jwt_token(user)
-            refresh_token = generate_refresh_token(user)
-            
-            return Response({
-                'message': 'Пользователь успешно зарегистрирован',
-                'access_token': token,
-                'refresh_token': refresh_token,
-                'user': UserProfileSerializer(user).data
-            }, status=status.HTTP_201_CREATED)
+            return Response(registration_payload(user), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AsyncRegistrationView(AsyncAPIView):
+    """Асинхронная регистрация: пароль хэшируется в пуле accounts.hashing, не в потоке запроса"""
+    query_budget = 5
+
+    async def post(self, request):
+        serializer = UserRegistrationSerializer(data=request_data(request))
+        # Проверки уникальности username и email — синхронные запросы сериализатора
+        if not await sync_to_async(serializer.is_valid)():
+            return api_response(serializer.errors, status=400)
+        user = await serializer.acreate()
+        await user.aupdate_activity()
+        return api_response(registration_payload(user), status=201)
+
+
 class LoginView(AuthView):
     """Представление авторизации пользователя"""
     permission_classes = [permissions.AllowAny]
+    query_budget = 1
     
     @swagger_auto_schema(
         operation_description="Аутентификация пользователя",
@@ -66,36 +125,47 @@ class LoginView(AuthView):
         if serializer.is_valid():
             email = serializer.validated_data['email']
             password = serializer.validated_data['password']
-            try:
-                user_obj = CustomUser.objects.get(email=email)
-                user = authenticate(username=user_obj.username, password=password)
-            except CustomUser.DoesNotExist:
-                user = None
+            # Пользователь читается один раз (accounts.backends.EmailBackend)
+            user = authenticate(request, email=email, password=password)
             
             if user:
                 user.update_activity()
-                access_token = generate_jwt_token(user)
-                refresh_token = generate_refresh_token(user)
-                response = JsonResponse({
-                    'message': 'Успешный вход',
-                    'user': UserProfileSerializer(user).data
-                })
-                response = set_auth_cookies(response, access_token, refresh_token)
-                return response
+                data, access_token, refresh_token = login_payload(user)
+                return set_auth_cookies(Response(data), access_token, refresh_token)
             return Response({'error': 'Неверные учетные данные'}, status=status.HTTP_401_UNAUTHORIZED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AsyncLoginView(AsyncAPIView):
+    """Асинхронный вход: EmailBackend.aauthenticate на асинхронной ORM"""
+    query_budget = 1
+
+    async def post(self, request):
+        serializer = UserLoginSerializer(data=request_data(request))
+        if not serializer.is_valid():
+            return api_response(serializer.errors, status=400)
+        user = await aauthenticate(
+            request, email=serializer.validated_data['email'], password=serializer.validated_data['password']
+        )
+        if user is None:
+            return api_response({'error': 'Неверные учетные данные'}, status=401)
+        await user.aupdate_activity()
+        data, access_token, refresh_token = login_payload(user)
+        return set_auth_cookies(api_response(data), access_token, refresh_token)
+
+
 class LogoutView(APIView):
     """Выход пользователя из системы"""
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
     
     @swagger_auto_schema(
         operation_description="Выход пользователя из системы",
     )
     def post(self, request):
         request.user.update_activity()
-        response = JsonResponse({'message': 'Успешный выход'})
+        token_cache.revoke(request.auth, request.COOKIES.get('access_token'))
+        response = Response({'message': 'Успешный выход'})
         response = delete_auth_cookies(response)
         return response
 
@@ -103,6 +173,7 @@ class LogoutView(APIView):
 class TokenRefreshView(AuthView):
     """Обновление токена в случае неактивности"""
     permission_classes = [permissions.AllowAny]
+    query_budget = 1
     
     @swagger_auto_schema(
         operation_description="Обновление access и refresh токенов по refresh токену",
@@ -133,7 +204,7 @@ class TokenRefreshView(AuthView):
             new_access_token = generate_jwt_token(user)
             new_refresh_token = generate_refresh_token(user)
             
-            response = JsonResponse({
+            response = Response({
                 'access_token': new_access_token,
                 'refresh_token': new_refresh_token,
                 'user': UserProfileSerializer(user).data
@@ -152,6 +223,11 @@ class TokenRefreshView(AuthView):
 class UserProfileView(APIView):
     """Представление профиля пользователя"""
     permission_classes = [permissions.IsAuthenticated] 
+    query_budget = {'get': 3, 'put': 4}
+
+    def get_user(self, request):
+        # В кэше аутентификации нет полей профиля (accounts.user_cache)
+        return CustomUser.objects.get(pk=request.user.pk)
     
     @swagger_auto_schema(
         operation_description="Получение профиля текущего пользователя",
@@ -160,7 +236,7 @@ class UserProfileView(APIView):
         request.user.update_activity()
         if not request.user or not request.user.is_authenticated:
             return Response({'error': 'Пользователь не аутентифицирован'}, status=status.HTTP_401_UNAUTHORIZED)
-        serializer = UserProfileSerializer(request.user)
+        serializer = UserProfileSerializer(self.get_user(request))
         return Response(serializer.data)
     
     @swagger_auto_schema(
@@ -169,12 +245,12 @@ class UserProfileView(APIView):
     )
     def put(self, request):
         request.user.update_activity()
-        serializer = UserUpdateSerializer(request.user, data=request.data, partial=True)
+        serializer = UserUpdateSerializer(self.get_user(request), data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            user = serializer.save()
             return Response({
                 'message': 'Данные успешно обновлены',
-                'user': UserProfileSerializer(request.user).data
+                'user': UserProfileSerializer(user).data
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -182,6 +258,7 @@ class UserProfileView(APIView):
 class AuthorUserProfileView(APIView):
     """Получение профиля автора"""
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 3
 
     @swagger_auto_schema(
         operation_description="Публичный профиль пользователя по username",
@@ -191,8 +268,22 @@ class AuthorUserProfileView(APIView):
             user = CustomUser.objects.get(username=username)
         except CustomUser.DoesNotExist:
             return Response({'error': 'Пользователь не найден'}, status=404)
-        serializer = UserProfileSerializer(user)
-        return Response(serializer.data)
+        etag = profile_etag(user)
+        return not_modified(request, etag) or set_validators(Response(UserProfileSerializer(user).data), etag)
+
+
+class AsyncAuthorUserProfileView(AsyncAPIView):
+    """Асинхронная версия публичного профиля автора"""
+    require_authentication = True
+    query_budget = 3
+
+    async def get(self, request, username):
+        try:
+            user = await CustomUser.objects.aget(username=username)
+        except CustomUser.DoesNotExist:
+            return api_response({'error': 'Пользователь не найден'}, status=404)
+        etag = profile_etag(user)
+        return not_modified(request, etag) or set_validators(api_response(UserProfileSerializer(user).data), etag)
 
 
 class AccountManagementView(APIView):
@@ -213,6 +304,16 @@ class AccountManagementView(APIView):
 class ListManagementView(APIView):
     """Работа с черным и белым списком пользователей"""
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'get': 3, 'post': 8, 'delete': 5}
+
+    @swagger_auto_schema(
+        operation_description="Проверка, находится ли пользователь в черном или белом списке",
+    )
+    def get(self, request, user_id, list_type):
+        """Проверка наличия пользователя в списке без загрузки списка"""
+        if list_type not in LIST_TYPES:
+            return Response({'error': 'Неверный тип списка'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'in_list': in_list(request.user, list_type, user_id)})
     
     @swagger_auto_schema(
         operation_description="Добавление пользователя в черный или белый список",
@@ -273,27 +374,101 @@ class ListManagementView(APIView):
             return Response({'error': 'Пользователь не найден'}, status=status.HTTP_404_NOT_FOUND)
 
 
+class BulkListManagementView(APIView):
+    """Массовое изменение черного и белого списков"""
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 9
+
+    @swagger_auto_schema(
+        operation_description="Массовое добавление и удаление пользователей в черном и белом списках. "
+                              "Все изменения выполняются в одной транзакции, результат — по каждому id",
+        request_body=BulkListSerializer,
+    )
+    def post(self, request):
+        request.user.update_activity()
+        serializer = BulkListSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(apply_bulk_list_changes(request.user, serializer.validated_data))
+
+
 class UserListsView(APIView):
     """Получение черного и белого списков"""
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 4
     
     @swagger_auto_schema(
-        operation_description="Получение черного и белого списков пользователя",
+        operation_description="Получение первых страниц черного и белого списков пользователя. "
+                              "Следующие страницы — через lists/<list_type>/?cursor=",
+        manual_parameters=[LIST_FIELDS_PARAMETER],
     )
     def get(self, request):
         request.user.update_activity()
-        blacklist = request.user.blacklist.all()
-        whitelist = request.user.whitelist.all()
+        fields = parse_list_fields(request.query_params.get('fields'))
+        blacklist, blacklist_cursor = list_page(request.user, 'blacklist', fields=fields)
+        whitelist, whitelist_cursor = list_page(request.user, 'whitelist', fields=fields)
         
         return Response({
-            'blacklist': UserListSerializer(blacklist, many=True).data,
-            'whitelist': UserListSerializer(whitelist, many=True).data
+            'blacklist': blacklist,
+            'whitelist': whitelist,
+            'blacklist_next_cursor': blacklist_cursor,
+            'whitelist_next_cursor': whitelist_cursor
         })
 
 
+class UserListPageView(APIView):
+    """Постраничное получение одного списка"""
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 3
+
+    @swagger_auto_schema(
+        operation_description="Страница черного или белого списка пользователя (новые записи первыми)",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Курсор следующей страницы"),
+            LIST_FIELDS_PARAMETER,
+        ],
+    )
+    def get(self, request, list_type):
+        if list_type not in LIST_TYPES:
+            return Response({'error': 'Неверный тип списка'}, status=status.HTTP_400_BAD_REQUEST)
+        request.user.update_activity()
+        items, next_cursor = list_page(
+            request.user, list_type,
+            cursor=request.query_params.get('cursor'),
+            fields=parse_list_fields(request.query_params.get('fields'))
+        )
+        return Response({'results': items, 'next_cursor': next_cursor})
+
+
+class UserListExportView(APIView):
+    """Выгрузка списка целиком"""
+    permission_classes = [permissions.IsAuthenticated]
+    # Без query_budget: строки выбираются при отправке тела, после замера запросов представления
+
+    @swagger_auto_schema(
+        operation_description="Черный или белый список пользователя одним потоком NDJSON "
+                              "(пользователь на строку, новые записи первыми). "
+                              "При Accept-Encoding: gzip ответ сжимается.",
+        manual_parameters=[LIST_FIELDS_PARAMETER],
+        responses={200: 'application/x-ndjson'},
+    )
+    def get(self, request, list_type):
+        if list_type not in LIST_TYPES:
+            return Response({'error': 'Неверный тип списка'}, status=status.HTTP_400_BAD_REQUEST)
+        request.user.update_activity()
+        fields = parse_list_fields(request.query_params.get('fields'))
+        chunk_size = export_chunk_size()
+        return ndjson_response(
+            request, list_export_rows(request.user, list_type, chunk_size, fields),
+            f'{list_type}.ndjson', chunk_size
+        )
+
+
 class RoleManagementView(APIView):
     """Назначение ролей пользователей"""
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 4
     
     @swagger_auto_schema(
         operation_description="Назначение пользователя модератором",
@@ -363,6 +538,7 @@ class ModeratorManagementView(APIView):
     """Управление для модераторов"""
     
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 3
     
     @swagger_auto_schema(
         operation_description="Получение списка модераторов",
@@ -403,26 +579,49 @@ class UserDeletionView(APIView):
 class ChangePasswordView(APIView):
     """Смена пароля пользователем"""
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 4
 
     @swagger_auto_schema(
         operation_description="Смена пароля пользователя",
         request_body=ChangePasswordSerializer,
     )
     def post(self, request):
-        user = request.user
+        # Хэша пароля нет в кэше аутентификации — строка пользователя читается целиком
+        user = CustomUser.objects.get(pk=request.user.pk)
         serializer = ChangePasswordSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         old_password = serializer.validated_data.get('old_password')
         new_password = serializer.validated_data.get('new_password')
-        if not user.check_password(old_password):
+        if not password_hasher.check_user_password(user, old_password):
             return Response({'error': 'Старый пароль неверен'}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            validate_password(new_password, user)
-        except (ValidationError, DjangoValidationError) as e:
-            errors = e.messages if hasattr(e, 'messages') else [str(e)]
+        errors = password_errors(new_password, user)
+        if errors:
             return Response({'error': errors}, status=status.HTTP_400_BAD_REQUEST)
-        user.set_password(new_password)
-        user.save()
+        password_hasher.set_password(user, new_password)
+        user.save(update_fields=['password'])
         user.update_activity()
         return Response({'message': 'Пароль успешно изменен'}, status=status.HTTP_200_OK)
+
+
+class AsyncChangePasswordView(AsyncAPIView):
+    """Асинхронная смена пароля: хэширование в пуле accounts.hashing"""
+    require_authentication = True
+    query_budget = 4
+
+    async def post(self, request):
+        user = await CustomUser.objects.aget(pk=request.user.pk)
+        serializer = ChangePasswordSerializer(data=request_data(request))
+        if not serializer.is_valid():
+            return api_response(serializer.errors, status=400)
+        old_password = serializer.validated_data['old_password']
+        new_password = serializer.validated_data['new_password']
+        if not await password_hasher.acheck_user_password(user, old_password):
+            return api_response({'error': 'Старый пароль неверен'}, status=400)
+        errors = password_errors(new_password, user)
+        if errors:
+            return api_response({'error': errors}, status=400)
+        await password_hasher.aset_password(user, new_password)
+        await user.asave(update_fields=['password'])
+        await user.aupdate_activity()
+        return api_response({'message': 'Пароль успешно изменен'})
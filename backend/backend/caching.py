@@ -0,0 +1,10 @@
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared_cache(cache):
+    """
+    Кэш виден всем процессам сервера (Redis, Memcached, БД, файлы).
+    LocMemCache у каждого воркера свой: инвалидация через него
+    не доходит до остальных воркеров
+    """
+    return not isinstance(cache, LocMemCache)
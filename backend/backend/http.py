@@ -0,0 +1,40 @@
+import time
+from calendar import timegm
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def _timestamp(last_modified):
+    """
+    Last-Modified с точностью до секунды. Версия, изменившаяся в текущую
+    секунду, может измениться еще раз с тем же значением — тогда None,
+    и клиент сверяет только ETag
+    """
+    if not last_modified:
+        return None
+    timestamp = timegm(last_modified.utctimetuple())
+    return timestamp if timestamp < int(time.time()) else None
+
+
+def set_validators(response, etag, last_modified=None):
+    """ETag, Last-Modified и обязательная перепроверка клиентом (персональные данные)"""
+    response.headers['ETag'] = etag
+    timestamp = _timestamp(last_modified)
+    if timestamp:
+        response.headers['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Ответ 304 (или 412 для If-Match), если валидаторы клиента совпадают
+    с текущими, иначе None — тогда ответ строится как обычно
+    """
+    validators = set_validators(HttpResponse(), etag, last_modified)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=_timestamp(last_modified), response=validators
+    )
+    return None if response is validators else response
@@ -0,0 +1,466 @@
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)
+
+_HEADER = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+
+class _MemoryValues:
+    """Значения метрик процесса в словаре (один процесс: runserver, тесты)"""
+
+    def __init__(self):
+        self._values = {}
+
+    def add(self, key, amount):
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def items(self):
+        return list(self._values.items())
+
+
+class _MmapValues:
+    """
+    Значения метрик процесса в файле, отображенном в память (mmap).
+    Формат: 8 байт — занятая длина, затем записи [длина ключа][ключ, выровненный до 8][double].
+    Новая запись сначала пишется целиком, потом увеличивается длина — читатель
+    в другом процессе видит только полные записи.
+    """
+    INITIAL_SIZE = 1 << 16
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._map(os.fstat(self._file.fileno()).st_size)
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        self._positions = {key: position for key, position, _ in _entries(self._mmap, self._used)}
+
+    def _map(self, size):
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is None:
+            encoded = key.encode()
+            length = _LENGTH.size + len(encoded)
+            length += -length % 8
+            if self._used + length + _VALUE.size > len(self._mmap):
+                size = len(self._mmap)
+                while self._used + length + _VALUE.size > size:
+                    size *= 2
+                self._mmap.close()
+                self._file.truncate(size)
+                self._map(size)
+            _LENGTH.pack_into(self._mmap, self._used, len(encoded))
+            self._mmap[self._used + _LENGTH.size:self._used + _LENGTH.size + len(encoded)] = encoded
+            position = self._used + length
+            _VALUE.pack_into(self._mmap, position, 0.0)
+            self._used = position + _VALUE.size
+            _HEADER.pack_into(self._mmap, 0, self._used)
+            self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        position = self._position(key)
+        _VALUE.pack_into(self._mmap, position, _VALUE.unpack_from(self._mmap, position)[0] + amount)
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._mmap, self._position(key), value)
+
+    def items(self):
+        return [(key, _VALUE.unpack_from(self._mmap, position)[0]) for key, position in self._positions.items()]
+
+
+def _entries(buffer, used):
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        key = bytes(buffer[position + _LENGTH.size:position + _LENGTH.size + length]).decode()
+        size = _LENGTH.size + length
+        position += size + (-size % 8)
+        yield key, position, _VALUE.unpack_from(buffer, position)[0]
+        position += _VALUE.size
+
+
+def _read_file(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < _HEADER.size:
+        return []
+    return [(key, value) for key, _, value in _entries(data, _HEADER.unpack_from(data, 0)[0])]
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_value(value):
+    if math.isfinite(value) and value == int(value) and abs(value) < 1 << 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _escape_help(value):
+    # В HELP экранируются только обратная косая черта и перевод строки
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._keys = {}
+
+    def key(self, labelvalues, sample=''):
+        key = self._keys.get((labelvalues, sample))
+        if key is None:
+            key = json.dumps([self.name, list(labelvalues), sample], ensure_ascii=False)
+            self._keys[labelvalues, sample] = key
+        return key
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        self.registry.add(self.key(labelvalues), amount)
+
+    def set_total(self, *labelvalues, value):
+        """Абсолютное значение счетчика процесса (для статистики, которую считают сами кэши)"""
+        self.registry.set(self.key(labelvalues), value)
+
+    def samples(self, values):
+        for (labelvalues, sample), value in sorted(values.items()):
+            yield self.name, _labels(self.labelnames, labelvalues), value
+
+
+class Gauge(Metric):
+    """Мгновенное значение; по процессам суммируются только живые"""
+    type = 'gauge'
+    live_only = True
+
+    def set(self, *labelvalues, value):
+        self.registry.set(self.key(labelvalues), value)
+
+    def samples(self, values):
+        for (labelvalues, sample), value in sorted(values.items()):
+            yield self.name, _labels(self.labelnames, labelvalues), value
+
+
+class Histogram(Metric):
+    """Гистограмма: в процессе хранятся некумулятивные корзины, сумма и число наблюдений"""
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._sample_keys_cache = {}
+
+    def _sample_keys(self, labelvalues):
+        keys = self._sample_keys_cache.get(labelvalues)
+        if keys is None:
+            keys = self._sample_keys_cache[labelvalues] = (
+                [self.key(labelvalues, str(index)) for index in range(len(self.buckets) + 1)],
+                self.key(labelvalues, 'sum'),
+                self.key(labelvalues, 'count'),
+            )
+        return keys
+
+    def observe(self, value, *labelvalues):
+        buckets, total, count = self._sample_keys(labelvalues)
+        self.registry.add_many((
+            (buckets[bisect.bisect_left(self.buckets, value)], 1),
+            (total, value),
+            (count, 1),
+        ))
+
+    def samples(self, values):
+        series = {}
+        for (labelvalues, sample), value in values.items():
+            series.setdefault(labelvalues, {})[sample] = value
+        for labelvalues in sorted(series):
+            samples = series[labelvalues]
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets + (float('inf'),)):
+                cumulative += samples.get(str(index), 0.0)
+                le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                yield (
+                    self.name + '_bucket',
+                    _labels(self.labelnames + ('le',), labelvalues + (le,)),
+                    cumulative,
+                )
+            yield self.name + '_sum', _labels(self.labelnames, labelvalues), samples.get('sum', 0.0)
+            yield self.name + '_count', _labels(self.labelnames, labelvalues), samples.get('count', 0.0)
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса в формате Prometheus. При METRICS_DIR каждый процесс
+    (воркер gunicorn) пишет значения в свой файл metrics_<pid>.db через mmap,
+    а /metrics суммирует файлы всех процессов; каталог очищается перед запуском сервера.
+    Счетчики завершенных процессов остаются в сумме, чтобы не идти назад.
+    Без METRICS_DIR — словарь в памяти процесса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._values = None
+        self._collectors = []
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # После fork у дочернего процесса свой файл; блокировка могла остаться захваченной
+        self._lock = threading.Lock()
+        self._values = None
+
+    @property
+    def directory(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        return Path(directory) if directory else None
+
+    def _open(self):
+        if self._values is None:
+            if self.directory is None:
+                self._values = _MemoryValues()
+            else:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                path = self.directory / f'metrics_{os.getpid()}.db'
+                if path.exists():
+                    # pid завершенного воркера достался новому процессу: значения старого
+                    # остаются в отдельном файле, иначе set_total нового процесса затер бы
+                    # накопленные счетчики и они пошли бы назад
+                    path.rename(self.directory / f'dead_{os.getpid()}_{time.time_ns()}.db')
+                self._values = _MmapValues(path)
+        return self._values
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def collector(self, func):
+        """Функция, обновляющая метрики процесса перед выгрузкой и периодически (sync_collectors)"""
+        self._collectors.append(func)
+        return func
+
+    def add(self, key, amount):
+        with self._lock:
+            self._open().add(key, amount)
+
+    def add_many(self, pairs):
+        with self._lock:
+            values = self._open()
+            for key, amount in pairs:
+                values.add(key, amount)
+
+    def set(self, key, value):
+        with self._lock:
+            self._open().set(key, value)
+
+    def sync_collectors(self):
+        for collector in self._collectors:
+            collector()
+
+    def _process_values(self):
+        """[(живой ли процесс, [(ключ, значение)])] — текущий процесс и файлы остальных"""
+        with self._lock:
+            own = self._open().items()
+        if self.directory is None:
+            return [(True, own)]
+        processes = [(True, own)]
+        for path in self.directory.glob('metrics_*.db'):
+            pid = int(path.stem.split('_')[1])
+            if pid != os.getpid():
+                processes.append((_process_alive(pid), _read_file(path)))
+        # Файлы завершенных процессов, чей pid занят новым: счетчики учитываются, gauge — нет
+        for path in self.directory.glob('dead_*.db'):
+            processes.append((False, _read_file(path)))
+        return processes
+
+    def collect(self):
+        """{имя метрики: {(значения меток, подвыборка): сумма по процессам}}"""
+        totals = {}
+        for alive, items in self._process_values():
+            for key, value in items:
+                name, labelvalues, sample = json.loads(key)
+                metric = self._metrics.get(name)
+                if metric is None or (getattr(metric, 'live_only', False) and not alive):
+                    continue
+                series = totals.setdefault(name, {})
+                index = (tuple(labelvalues), sample)
+                series[index] = series.get(index, 0.0) + value
+        return totals
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4"""
+        self.sync_collectors()
+        totals = self.collect()
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f'# HELP {name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for sample, labels, value in metric.samples(totals.get(name, {})):
+                lines.append(f'{sample}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    'blogtest_http_request_duration_seconds', 'Время обработки запроса по имени URL',
+    ('url_name', 'method'), LATENCY_BUCKETS
+)
+http_responses = registry.counter(
+    'blogtest_http_responses_total', 'Ответы по имени URL и статусу', ('url_name', 'method', 'status')
+)
+db_queries = registry.histogram(
+    'blogtest_db_queries_per_request', 'SQL-запросов на запрос', ('url_name',), QUERY_COUNT_BUCKETS
+)
+db_time = registry.histogram(
+    'blogtest_db_time_seconds', 'Суммарное время SQL-запросов на запрос', ('url_name',), DB_TIME_BUCKETS
+)
+pagination_page = registry.histogram(
+    'blogtest_pagination_page', 'Номер запрошенной страницы (?page=)', ('url_name',), PAGE_BUCKETS
+)
+pagination_cursor = registry.counter(
+    'blogtest_pagination_cursor_requests_total', 'Запросы с курсорной пагинацией (?cursor=)', ('url_name', 'first_page')
+)
+auth_outcomes = registry.counter(
+    'blogtest_auth_outcomes_total', 'Результаты JWT-аутентификации', ('outcome',)
+)
+cache_hits = registry.counter('blogtest_cache_hits_total', 'Попадания в кэши процесса', ('cache',))
+cache_misses = registry.counter('blogtest_cache_misses_total', 'Промахи кэшей процесса', ('cache',))
+cache_entries = registry.gauge('blogtest_cache_entries', 'Записей в кэшах процессов', ('cache',))
+password_hash_in_flight = registry.gauge(
+    'blogtest_password_hash_in_flight', 'Хэширований пароля в работе'
+)
+password_hash_rejected = registry.counter(
+    'blogtest_password_hash_rejected_total', 'Отказы хэширования паролей сверх лимита (429)'
+)
+
+
+@registry.collector
+def collect_cache_stats():
+    from accounts.acl import acl_graph
+    from accounts.hashing import password_hasher
+    from accounts.token_cache import token_cache
+    from accounts.user_cache import user_cache
+    from blogs.cache import feed_cache
+
+    feed, acl, token, user, hashing = (
+        feed_cache.stats(), acl_graph.stats(), token_cache.stats(), user_cache.stats(), password_hasher.stats()
+    )
+    for cache, stats in (('feed', feed), ('acl', acl), ('token', token), ('user', user)):
+        cache_hits.set_total(cache, value=stats['hits'])
+        cache_misses.set_total(cache, value=stats['misses'])
+    cache_hits.set_total('user_shared', value=user['shared_hits'])
+    cache_entries.set('acl', value=acl['users'])
+    cache_entries.set('token', value=token['entries'])
+    cache_entries.set('user', value=user['local_entries'])
+    password_hash_in_flight.set(value=hashing['in_flight'])
+    password_hash_rejected.set_total(value=hashing['rejected'])
+
+
+class MetricsMiddleware:
+    """
+    Время запроса, статус, SQL-запросы (из QueryStatsMiddleware) и глубина пагинации
+    по имени URL. Статистика кэшей процесса переносится в метрики не чаще
+    раза в METRICS_COLLECT_INTERVAL секунд. Ставится перед QueryStatsMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.collect_interval = getattr(settings, 'METRICS_COLLECT_INTERVAL', 10)
+        self._collected_at = 0.0
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, response, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        # Нераспознанные URL — одной меткой, чтобы не раздувать число рядов
+        url_name = (match.url_name or match.view_name) if match else 'unresolved'
+        http_request_duration.observe(elapsed, url_name, request.method)
+        http_responses.inc(url_name, request.method, str(response.status_code))
+        recorder = getattr(request, 'query_recorder', None)
+        if recorder is not None:
+            db_queries.observe(recorder.count, url_name)
+            db_time.observe(recorder.duration, url_name)
+        if match is not None and request.method == 'GET':
+            self.observe_pagination(request, url_name)
+        now = time.monotonic()
+        if now - self._collected_at > self.collect_interval:
+            self._collected_at = now
+            registry.sync_collectors()
+
+    def observe_pagination(self, request, url_name):
+        if 'cursor' in request.GET:
+            pagination_cursor.inc(url_name, str(not request.GET['cursor']).lower())
+            return
+        page = request.GET.get('page')
+        if page is not None and page.isdigit():
+            pagination_page.observe(int(page), url_name)
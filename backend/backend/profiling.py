@@ -0,0 +1,211 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+from .querystats import view_label
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+MODES = ('cprofile', 'sample')
+_SIGNER_SALT = 'backend.profiling'
+
+
+def profiling_token(mode=None):
+    """Значение заголовка X-Profile; mode — режим для этого запроса (по умолчанию PROFILING_MODE)"""
+    return signing.TimestampSigner(salt=_SIGNER_SALT).sign(mode or '')
+
+
+def token_mode(token):
+    """Режим из подписанного заголовка или None, если подпись неверна или устарела"""
+    try:
+        mode = signing.TimestampSigner(salt=_SIGNER_SALT).unsign(
+            token, max_age=getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600)
+        )
+    except signing.BadSignature:
+        return None
+    return mode if mode in MODES else getattr(settings, 'PROFILING_MODE', 'cprofile')
+
+
+class DeterministicProfiler:
+    """cProfile текущего потока, результат — файл pstats"""
+    suffix = '.prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class StackSampler:
+    """
+    Семплирующий профилировщик: фоновый поток с интервалом снимает стек
+    профилируемого потока (sys._current_frames). Результат — свернутые стеки
+    в формате flamegraph.pl/speedscope: «кадр;кадр;кадр число_снимков»
+    """
+    suffix = '.collapsed'
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.001)
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{Path(code.co_filename).name}:{code.co_qualname}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+PROFILERS = {'cprofile': DeterministicProfiler, 'sample': StackSampler}
+
+
+class ProfileStore:
+    """Каталог профилей с ротацией: не больше PROFILING_MAX_FILES файлов и PROFILING_MAX_BYTES байт"""
+
+    @property
+    def directory(self):
+        return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+    def path(self, label, suffix):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r'[^\w.-]+', '_', label)
+        return self.directory / f'{name}-{time.strftime("%Y%m%dT%H%M%S")}-{time.time_ns() % 10**9:09d}{suffix}'
+
+    def rotate(self):
+        max_files = getattr(settings, 'PROFILING_MAX_FILES', 200)
+        max_bytes = getattr(settings, 'PROFILING_MAX_BYTES', 100 * 1024 * 1024)
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(tuple(profiler.suffix for profiler in PROFILERS.values())):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        while files and (len(files) > max_files or total > max_bytes):
+            _, size, path = files.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запроса по подписанному заголовку X-Profile (manage.py profiling_token)
+    или случайной доли PROFILING_SAMPLE_RATE. Профиль сохраняется в PROFILING_DIR
+    под именем представления (BlogAPIView.get-...), имя файла — в заголовке X-Profile-File.
+    При PROFILING_ENABLED=False middleware отключается целиком; непрофилируемый
+    запрос стоит одной проверки заголовка и одного random().
+    Под ASGI профилируется поток цикла событий: ORM в потоках sync_to_async
+    видна как ожидание, а в профиль могут попасть соседние запросы.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def mode(self, request):
+        token = request.headers.get(PROFILE_HEADER)
+        if token is not None:
+            return token_mode(token)
+        if self.sample_rate and random.random() < self.sample_rate:
+            return getattr(settings, 'PROFILING_MODE', 'cprofile')
+        return None
+
+    def start(self, mode):
+        profiler = PROFILERS[mode]()
+        try:
+            profiler.start()
+        except ValueError:
+            # Другой профилировщик уже активен (например, соседний запрос в 3.12+)
+            return None
+        return profiler
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = self.mode(request)
+        profiler = self.start(mode) if mode else None
+        if profiler is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        return self.save(request, response, profiler, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        mode = self.mode(request)
+        profiler = self.start(mode) if mode else None
+        if profiler is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+        return self.save(request, response, profiler, time.perf_counter() - started)
+
+    def save(self, request, response, profiler, elapsed):
+        path = profile_store.path(view_label(request) or 'unresolved', profiler.suffix)
+        try:
+            profiler.dump(path)
+            profile_store.rotate()
+        except OSError:
+            logger.exception('Не удалось сохранить профиль запроса %s', request.path)
+            return response
+        logger.info('Профиль %s (%.1f мс): %s', request.path, elapsed * 1000, path)
+        if PROFILE_HEADER in request.headers:
+            response.headers['X-Profile-File'] = path.name
+        return response
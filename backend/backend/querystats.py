@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Длина SQL в заголовке X-DB-Slowest-SQL
+HEADER_SQL_LENGTH = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    Число запросов, суммарное время в БД и самый медленный запрос
+    (SQL без параметров — значения в статистику не попадают)
+    """
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+        self.statements = [] if keep_sql else None
+
+    def add(self, sql, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        if elapsed >= self.slowest_time:
+            self.slowest_time, self.slowest_sql = elapsed, sql
+        if self.statements is not None:
+            self.statements.append(sql)
+
+    @contextmanager
+    def installed(self):
+        """Запросы текущего контекста, в том числе из потоков sync_to_async"""
+        for alias in connections:
+            _install(connections[alias])
+        token = _recorders.set(_recorders.get() + (self,))
+        try:
+            yield self
+        finally:
+            _recorders.reset(token)
+
+
+# Активные записи текущего контекста. Соединения у каждого потока свои,
+# поэтому обертка одна на соединение, а записи находит через contextvar:
+# sync_to_async копирует контекст в поток асинхронного представления
+_recorders = ContextVar('query_recorders', default=())
+
+
+def _record_query(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.add(sql, elapsed)
+
+
+def _install(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    _install(connection)
+
+
+def view_label(request):
+    """BlogAPIView.get для классов, путь функции для функций; None — URL не найден"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'view_class', None)
+    if view_class is None:
+        return match._func_path
+    return f'{view_class.__name__}.{request.method.lower()}'
+
+
+def view_budget(request):
+    """
+    Бюджет запросов представления: атрибут query_budget класса —
+    число или словарь по методам ({'post': 6, 'delete': 4})
+    """
+    match = getattr(request, 'resolver_match', None)
+    budget = getattr(getattr(match.func, 'view_class', None), 'query_budget', None) if match else None
+    if isinstance(budget, dict):
+        return budget.get(request.method.lower())
+    return budget
+
+
+class QueryStats:
+    """Агрегированная по представлениям статистика запросов в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, label, recorder, budget=None):
+        over_budget = budget is not None and recorder.count > budget
+        with self._lock:
+            view = self._views.get(label)
+            if view is None:
+                view = self._views[label] = {
+                    'requests': 0, 'queries': 0, 'queries_max': 0, 'db_time': 0.0, 'db_time_max': 0.0,
+                    'slowest_time': 0.0, 'slowest_sql': '', 'budget': budget, 'over_budget': 0,
+                }
+            view['requests'] += 1
+            view['queries'] += recorder.count
+            view['queries_max'] = max(view['queries_max'], recorder.count)
+            view['db_time'] += recorder.duration
+            view['db_time_max'] = max(view['db_time_max'], recorder.duration)
+            if recorder.slowest_time > view['slowest_time']:
+                view['slowest_time'], view['slowest_sql'] = recorder.slowest_time, recorder.slowest_sql
+            view['budget'] = budget
+            view['over_budget'] += over_budget
+        return over_budget
+
+    def stats(self):
+        with self._lock:
+            views = {label: dict(view) for label, view in self._views.items()}
+        for view in views.values():
+            view['queries_avg'] = view['queries'] / view['requests']
+            view['db_time_avg'] = view['db_time'] / view['requests']
+        return views
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+query_stats = QueryStats()
+
+
+class QueryStatsMiddleware:
+    """
+    Счет SQL-запросов и времени в БД на запрос (синхронные и асинхронные представления).
+    Итоги копятся в query_stats; при QUERY_STATS_HEADERS (по умолчанию DEBUG)
+    добавляются заголовки X-DB-Queries, X-DB-Time-Ms, X-DB-Slowest-Ms, X-DB-Slowest-SQL.
+    Превышение бюджета (query_budget представления) пишется в лог.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_STATS_ENABLED', True):
+            return self.get_response(request)
+        with QueryRecorder().installed() as recorder:
+            response = self.get_response(request)
+        return self.finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'QUERY_STATS_ENABLED', True):
+            return await self.get_response(request)
+        with QueryRecorder().installed() as recorder:
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder)
+
+    def finish(self, request, response, recorder):
+        # Для MetricsMiddleware (гистограммы запросов по имени URL)
+        request.query_recorder = recorder
+        label = view_label(request)
+        if label is None:
+            return response
+        budget = view_budget(request)
+        if query_stats.record(label, recorder, budget):
+            logger.warning('%s: %d SQL-запросов при бюджете %d', label, recorder.count, budget)
+        if getattr(settings, 'QUERY_STATS_HEADERS', settings.DEBUG):
+            response.headers['X-DB-Queries'] = str(recorder.count)
+            response.headers['X-DB-Time-Ms'] = f'{recorder.duration * 1000:.2f}'
+            if recorder.count:
+                response.headers['X-DB-Slowest-Ms'] = f'{recorder.slowest_time * 1000:.2f}'
+                sql = ' '.join(recorder.slowest_sql.split())[:HEADER_SQL_LENGTH]
+                response.headers['X-DB-Slowest-SQL'] = sql.encode('ascii', 'replace').decode()
+            if budget is not None:
+                response.headers['X-DB-Query-Budget'] = str(budget)
+        return response
+
+
+@contextmanager
+def assert_max_queries(budget, label='block'):
+    """
+    Для тестов и проверок: QueryBudgetExceeded, если внутри блока
+    выполнено больше budget SQL-запросов (в сообщении — все запросы)
+    """
+    with QueryRecorder(keep_sql=True).installed() as recorder:
+        yield recorder
+    if recorder.count > budget:
+        raise QueryBudgetExceeded(
+            f'{label}: {recorder.count} SQL-запросов при бюджете {budget}:\n'
+            + '\n'.join(f'{number}. {sql}' for number, sql in enumerate(recorder.statements, 1))
+        )
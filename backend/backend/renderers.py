@@ -0,0 +1,98 @@
+import io
+import math
+import re
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Даты и время передаются в JSONEncoder DRF (формат ...Z), ключи — любые скаляры
+ORJSON_OPTIONS = (
+    (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS)
+    if orjson is not None else 0
+)
+
+
+def _has_non_finite(data):
+    """Есть ли в данных NaN или бесконечность (orjson пишет их как null)"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Decimal):
+            if not value.is_finite():
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Вывод совпадает со стандартным байт в байт, кроме
+    записи чисел с плавающей точкой: orjson выбирает другую форму —
+    0.00001 вместо 1e-05, 1e16 вместо 1e+16, 1.5e-7 вместо 1.5e-07
+    (при разборе значения те же). NaN и бесконечности orjson пишет как null, поэтому такие
+    данные кодирует стандартный json — с ValueError, как у JSONRenderer.
+    Типы, которых orjson не знает (Decimal, ленивые строки, даты), кодируются
+    JSONEncoder DRF. Все, что orjson закодировать не может (целые больше 64 бит,
+    нестроковые ключи особых типов), запросы с отступами (indent) и настройки
+    UNICODE_JSON/COMPACT_JSON/STRICT_JSON, отличные от умолчаний, уходят
+    в стандартный json. Без orjson — обычный JSONRenderer.
+    """
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._encoder.default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Обход данных — только если в ответе есть null
+        if b'null' in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как в JSONRenderer: U+2028 и U+2029 допустимы в JSON, но не в JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+# 19 цифр подряд — число может не поместиться в 64 бита
+_WIDE_INT = re.compile(rb'\d{19}')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser на orjson. orjson читает целые больше 64 бит как float с потерей
+    точности, поэтому тела с длинными числами (и с такими строками цифр) разбирает
+    стандартный json, как и тела не в UTF-8, с ошибками и без orjson
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if not _WIDE_INT.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                # Сообщение об ошибке — как у JSONParser
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.metrics.MetricsMiddleware',
+    # Учитывает и запросы остальных middleware
+    'backend.querystats.QueryStatsMiddleware',
+    'backend.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -128,6 +133,17 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Кастомная модель пользователя
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# Вход по email — один запрос к БД; ModelBackend остается для админки
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Одновременных хэширований паролей в процессе (accounts.hashing), сверх лимита — 429.
+# Должно быть меньше числа потоков воркера (gunicorn --threads), чтобы оставались
+# потоки для остальных запросов
+PASSWORD_HASH_CONCURRENCY = 2
+
 # Настройки REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -136,6 +152,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # JSON через orjson (если установлен) с тем же результатом, что у стандартного рендерера
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'backend.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # Настройки JWT
@@ -144,6 +170,78 @@ JWT_ALGORITHM = 'HS256'
 JWT_ACCESS_TOKEN_LIFETIME = 60 * 60  # 1 час
 JWT_REFRESH_TOKEN_LIFETIME = 60 * 60  # 1 час
 
+# Кэш (страницы ленты, поколения инвалидации). LocMemCache — память одного процесса;
+# для кэша ленты и общего уровня кэша пользователей нужен общий бэкенд, например
+# 'django.core.cache.backends.redis.RedisCache' или 'django.core.cache.backends.db.DatabaseCache'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Кэш страниц ленты: алиас из CACHES и TTL в секундах (0 — отключен).
+# Работает только с общим для процессов бэкендом (Redis, Memcached, БД):
+# на LocMemCache инвалидация не доходит до других воркеров, и кэш отключается
+BLOG_FEED_CACHE_ALIAS = 'default'
+BLOG_FEED_CACHE_TIMEOUT = 60
+
+# count ленты для пользователей с длинными списками: оценка вместо точного COUNT(*)
+BLOG_FEED_ESTIMATE_COUNTS = False
+
+# Материализованные ленты (fan-out on write), строятся командой backfill_timelines
+BLOG_TIMELINE_ENABLED = False
+
+# Отложенная запись last_activity: не чаще раза в минуту на пользователя,
+# фоновый сброс пачкой каждые 5 секунд (0 — синхронно при отметке)
+ACTIVITY_WRITE_BEHIND = True
+ACTIVITY_MIN_WRITE_INTERVAL = 60
+ACTIVITY_FLUSH_INTERVAL = 5
+
+# Кэш пользователей в JWTAuthentication: LRU процесса + общий кэш (None — только LRU).
+# Алиас общего уровня должен указывать на общий для процессов бэкенд (Redis, БД):
+# на LocMemCache понижение роли или смена пароля не дошли бы до других воркеров,
+# поэтому такой алиас игнорируется
+USER_CACHE_ENABLED = True
+USER_CACHE_LOCAL_TTL = 5
+USER_CACHE_LOCAL_SIZE = 10000
+USER_CACHE_ALIAS = None
+USER_CACHE_SHARED_TTL = 300
+
+# LRU проверенных JWT (0 — отключен)
+TOKEN_CACHE_SIZE = 10000
+
+# Счет SQL-запросов на представление (backend.querystats); заголовки X-DB-* — только при DEBUG
+QUERY_STATS_ENABLED = True
+QUERY_STATS_HEADERS = DEBUG
+
+# Потоковые выгрузки NDJSON (backend.streaming): строк на выборку из курсора БД
+# и на фрагмент ответа; gzip — при Accept-Encoding: gzip
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_GZIP = True
+
+# Метрики Prometheus на /metrics (backend.metrics): доступ — администраторам или по
+# Authorization: Bearer METRICS_TOKEN. Под gunicorn METRICS_DIR — общий каталог файлов
+# процессов (очищать перед запуском), без него — память процесса
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_COLLECT_INTERVAL = 10
+
+# Профилирование запросов (backend.profiling): по подписанному заголовку X-Profile
+# (manage.py profiling_token) или случайной доле запросов; режим cprofile (pstats) или sample
+# (свернутые стеки); старые профили удаляются сверх лимита файлов и байт
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_MODE = 'cprofile'
+PROFILING_SAMPLE_INTERVAL = 0.001
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = 200
+PROFILING_MAX_BYTES = 100 * 1024 * 1024
+
 # Настройки Swagger (drf_yasg)
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
@@ -0,0 +1,97 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .renderers import FastJSONRenderer
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+_accepts_gzip = re.compile(r'\bgzip\b')
+_renderer = FastJSONRenderer()
+
+
+def export_chunk_size():
+    """Строк на одну выборку из курсора БД и на один фрагмент ответа"""
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def accepts_gzip(request):
+    return getattr(settings, 'EXPORT_GZIP', True) and bool(
+        _accepts_gzip.search(request.headers.get('Accept-Encoding', ''))
+    )
+
+
+class GzipStream:
+    """
+    Потоковое gzip-сжатие: каждый фрагмент дожимается Z_SYNC_FLUSH,
+    чтобы клиент мог разбирать строки, не дожидаясь конца ответа
+    """
+
+    def __init__(self, level=6):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def _lines(batch):
+    # Тот же JSON, что у API (orjson, если установлен), по строке на объект
+    return b''.join(_renderer.render(row) + b'\n' for row in batch)
+
+
+def ndjson_chunks(rows, chunk_size, gzip=False):
+    """Строки NDJSON фрагментами по chunk_size объектов; в памяти — не больше одного фрагмента"""
+    stream = GzipStream() if gzip else None
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield stream.compress(_lines(batch)) if stream else _lines(batch)
+            batch = []
+    if batch:
+        yield stream.compress(_lines(batch)) if stream else _lines(batch)
+    if stream:
+        yield stream.finish()
+
+
+async def andjson_chunks(rows, chunk_size, gzip=False):
+    """ndjson_chunks() для асинхронного итератора строк"""
+    stream = GzipStream() if gzip else None
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield stream.compress(_lines(batch)) if stream else _lines(batch)
+            batch = []
+    if batch:
+        yield stream.compress(_lines(batch)) if stream else _lines(batch)
+    if stream:
+        yield stream.finish()
+
+
+def ndjson_response(request, rows, filename, chunk_size=None):
+    """
+    Потоковый ответ NDJSON (файл filename) из итератора словарей rows:
+    синхронного — для WSGI, асинхронного — для ASGI (синхронный итератор
+    под ASGI Django сначала читает целиком). При Accept-Encoding: gzip
+    ответ сжимается. Запросы к БД внутри rows выполняются при отправке тела,
+    уже после middleware, и в QueryStats/бюджет представления не входят.
+    """
+    chunk_size = chunk_size or export_chunk_size()
+    gzip = accepts_gzip(request)
+    chunks = andjson_chunks if hasattr(rows, '__aiter__') else ndjson_chunks
+    response = StreamingHttpResponse(
+        chunks(rows, chunk_size, gzip), content_type=NDJSON_CONTENT_TYPE,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+    if gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    patch_cache_control(response, private=True, no_store=True)
+    return response
@@ -0,0 +1,190 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from accounts.authentication import generate_jwt_token
+from accounts.tests import ProcessCacheTestCase, create_user
+from .metrics import MetricsRegistry, _MmapValues
+from .renderers import FastJSONParser, FastJSONRenderer
+
+
+class FastJSONTests(SimpleTestCase):
+    """orjson-рендерер и парсер дают те же данные, что стандартные JSONRenderer и JSONParser"""
+
+    data = {
+        'id': 42,
+        'wide': 2 ** 64,
+        'negative': -2 ** 63 - 1,
+        'floats': [0.1, 1e-05, 1e16, 1.5e-07, -0.0],
+        'text': 'Привет\u2028"мир"',
+        'nested': [{'ok': True, 'none': None}],
+    }
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), 'application/json', {})
+
+    def test_round_trip(self):
+        rendered = FastJSONRenderer().render(self.data)
+        self.assertEqual(self.parse(FastJSONParser(), rendered), self.data)
+        self.assertEqual(self.parse(FastJSONParser(), rendered), self.parse(JSONParser(), rendered))
+        self.assertEqual(json.loads(rendered), json.loads(JSONRenderer().render(self.data)))
+        self.assertIn(b'\\u2028', rendered)
+
+    def test_wide_integers_exact(self):
+        body = b'{"a": 18446744073709551616, "b": -9223372036854775809, "c": 123456789012345678901234567890}'
+        parsed = self.parse(FastJSONParser(), body)
+        self.assertEqual(parsed, {'a': 2 ** 64, 'b': -2 ** 63 - 1, 'c': 123456789012345678901234567890})
+        self.assertTrue(all(isinstance(value, int) for value in parsed.values()))
+
+    def test_errors_match_json_parser(self):
+        for body in (b'{"a": ', b'{"a": NaN}', b'\xff'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as fast:
+                    self.parse(FastJSONParser(), body)
+                with self.assertRaises(ParseError) as standard:
+                    self.parse(JSONParser(), body)
+                self.assertEqual(str(fast.exception.detail), str(standard.exception.detail))
+
+
+def make_registry():
+    registry = MetricsRegistry()
+    registry.counter('test_requests_total', 'Запросы "всего"\nпо пути', ('path',))
+    registry.counter('test_hits_total', 'Попадания, которые процесс считает сам')
+    registry.gauge('test_entries', 'Записи')
+    registry.histogram('test_seconds', 'Время', ('view',), buckets=(0.1, 1))
+    return registry
+
+
+def observe(registry, hits=0):
+    metrics = registry._metrics
+    metrics['test_requests_total'].inc('/a"b')
+    metrics['test_requests_total'].inc('/a"b', amount=2)
+    metrics['test_hits_total'].set_total(value=hits)
+    metrics['test_entries'].set(value=1.5)
+    for value in (0.05, 0.5, 3):
+        metrics['test_seconds'].observe(value, 'feed')
+
+
+def other_process(directory, pid, hits=0):
+    """Реестр, пишущий в файл другого процесса"""
+    registry = make_registry()
+    registry._values = _MmapValues(Path(directory) / f'metrics_{pid}.db')
+    observe(registry, hits)
+
+
+def dead_pid():
+    return int(subprocess.run(
+        [sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True, check=True
+    ).stdout)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    """Формат Prometheus и суммирование значений процессов из файлов METRICS_DIR"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def samples(self, registry):
+        return [line for line in registry.render().splitlines() if not line.startswith('#')]
+
+    @override_settings(METRICS_DIR=None)
+    def test_exposition_format(self):
+        registry = make_registry()
+        observe(registry, hits=4)
+        self.assertEqual(registry.render(), '\n'.join((
+            '# HELP test_entries Записи',
+            '# TYPE test_entries gauge',
+            'test_entries 1.5',
+            '# HELP test_hits_total Попадания, которые процесс считает сам',
+            '# TYPE test_hits_total counter',
+            'test_hits_total 4',
+            '# HELP test_requests_total Запросы "всего"\\nпо пути',
+            '# TYPE test_requests_total counter',
+            'test_requests_total{path="/a\\"b"} 3',
+            '# HELP test_seconds Время',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="feed",le="0.1"} 1',
+            'test_seconds_bucket{view="feed",le="1"} 2',
+            'test_seconds_bucket{view="feed",le="+Inf"} 3',
+            'test_seconds_sum{view="feed"} 3.55',
+            'test_seconds_count{view="feed"} 3',
+        )) + '\n')
+
+    def test_sums_live_processes(self):
+        with override_settings(METRICS_DIR=self.directory):
+            registry = make_registry()
+            observe(registry, hits=4)
+            other_process(self.directory, os.getppid(), hits=6)
+            self.assertEqual(self.samples(registry), [
+                'test_entries 3',
+                'test_hits_total 10',
+                'test_requests_total{path="/a\\"b"} 6',
+                'test_seconds_bucket{view="feed",le="0.1"} 2',
+                'test_seconds_bucket{view="feed",le="1"} 4',
+                'test_seconds_bucket{view="feed",le="+Inf"} 6',
+                'test_seconds_sum{view="feed"} 7.1',
+                'test_seconds_count{view="feed"} 6',
+            ])
+
+    def test_dead_process_keeps_counters(self):
+        with override_settings(METRICS_DIR=self.directory):
+            registry = make_registry()
+            observe(registry, hits=4)
+            other_process(self.directory, dead_pid(), hits=6)
+            samples = self.samples(registry)
+        # gauge завершенного процесса не учитывается, счетчики и гистограммы — да
+        self.assertIn('test_entries 1.5', samples)
+        self.assertIn('test_hits_total 10', samples)
+        self.assertIn('test_requests_total{path="/a\\"b"} 6', samples)
+        self.assertIn('test_seconds_count{view="feed"} 6', samples)
+
+    def test_reused_pid_does_not_reset_counters(self):
+        # Файл с pid текущего процесса остался от завершенного воркера
+        other_process(self.directory, os.getpid(), hits=6)
+        with override_settings(METRICS_DIR=self.directory):
+            registry = make_registry()
+            registry._metrics['test_requests_total'].inc('/a"b')
+            registry._metrics['test_hits_total'].set_total(value=1)
+            samples = self.samples(registry)
+            self.assertEqual(len(list(Path(self.directory).glob('dead_*.db'))), 1)
+        # Значения не пропали и не посчитаны дважды
+        self.assertIn('test_hits_total 7', samples)
+        self.assertIn('test_requests_total{path="/a\\"b"} 4', samples)
+        self.assertIn('test_seconds_count{view="feed"} 3', samples)
+        self.assertNotIn('test_entries 1.5', samples)
+
+
+class MetricsViewTests(ProcessCacheTestCase):
+    """/metrics — администраторам и сборщику с METRICS_TOKEN"""
+
+    def get(self, authorization=None):
+        headers = {'Authorization': authorization} if authorization else {}
+        return self.client.get('/metrics', headers=headers)
+
+    def test_access(self):
+        user = create_user('user')
+        admin = create_user('admin', is_staff=True)
+        with override_settings(METRICS_TOKEN='scraper-token'):
+            self.assertEqual(self.get().status_code, 403)
+            self.assertEqual(self.get(f'Bearer {generate_jwt_token(user)}').status_code, 403)
+            self.assertEqual(self.get('Bearer wrong-token').status_code, 403)
+            for authorization in (f'Bearer {generate_jwt_token(admin)}', 'Bearer scraper-token'):
+                response = self.get(authorization)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+                self.assertIn('# TYPE blogtest_http_responses_total counter', response.content.decode())
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_token_disabled(self):
+        self.assertEqual(self.get('Bearer None').status_code, 403)
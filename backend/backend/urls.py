@@ -19,6 +19,7 @@ from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from .views import MetricsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -35,5 +36,6 @@ urlpatterns = [
     path('api/accounts/', include('accounts.urls')),
     path('api/blogs/', include('blogs.urls')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
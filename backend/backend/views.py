@@ -0,0 +1,42 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import authentication, permissions
+from rest_framework.views import APIView
+
+from accounts.authentication import JWTAuthentication
+from .metrics import registry
+
+METRICS_SCRAPER = 'metrics-token'
+
+
+class MetricsTokenAuthentication(authentication.BaseAuthentication):
+    """Сборщик Prometheus: Authorization: Bearer METRICS_TOKEN (JWT живет час, для сбора не годится)"""
+
+    def authenticate(self, request):
+        expected = getattr(settings, 'METRICS_TOKEN', None)
+        header = request.headers.get('Authorization', '')
+        if expected and header.startswith('Bearer ') and hmac.compare_digest(header[7:], expected):
+            return AnonymousUser(), METRICS_SCRAPER
+        return None
+
+
+class IsAdminOrMetricsScraper(permissions.BasePermission):
+    def has_permission(self, request, view):
+        if request.auth == METRICS_SCRAPER:
+            return True
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or user.is_superuser))
+
+
+class MetricsView(APIView):
+    """Метрики процессов в текстовом формате Prometheus (только администраторы)"""
+    authentication_classes = [MetricsTokenAuthentication, JWTAuthentication]
+    permission_classes = [IsAdminOrMetricsScraper]
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
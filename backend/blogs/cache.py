@@ -0,0 +1,123 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from backend.caching import is_shared_cache
+
+# Поколения: public — меняется при изменении публичных блогов (лента анонимов),
+# all — при любом изменении блогов, user:<id> — при изменении списков пользователя
+PUBLIC_GENERATION = 'feed:gen:public'
+ALL_GENERATION = 'feed:gen:all'
+
+
+def user_generation_key(user_id):
+    return f'feed:gen:user:{user_id}'
+
+
+class FeedCache:
+    """
+    Кэш страниц ленты поверх Django cache framework.
+    Ключ страницы включает номера поколений, поэтому инвалидация — это
+    увеличение поколения, а устаревшие страницы вытесняются по TTL и размеру кэша.
+    Поколения должны быть общими для всех воркеров, поэтому на LocMemCache
+    кэш отключен: иначе удаленный или скрытый блог виден в других воркерах до TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'BLOG_FEED_CACHE_ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'BLOG_FEED_CACHE_TIMEOUT', 60)
+
+    @property
+    def enabled(self):
+        return self.timeout > 0 and is_shared_cache(self.cache)
+
+    def _generations(self, keys):
+        values = self.cache.get_many(keys)
+        for key in keys:
+            if key not in values:
+                # Новое поколение не должно совпасть с вытесненным ранее значением
+                self.cache.add(key, time.time_ns(), timeout=None)
+                values[key] = self.cache.get(key)
+        return [values[key] for key in keys]
+
+    def bump(self, *keys):
+        for key in keys:
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, time.time_ns(), timeout=None)
+
+    def bump_blogs(self, public):
+        """Изменение блога: публичного — сбрасывает и ленту анонимов"""
+        self.bump(ALL_GENERATION, *([PUBLIC_GENERATION] if public else []))
+
+    def bump_users(self, *user_ids):
+        self.bump(*(user_generation_key(user_id) for user_id in user_ids))
+
+    def _position(self, query_params):
+        if 'cursor' in query_params:
+            position = f"cursor:{query_params.get('cursor')}"
+        else:
+            position = f"page:{query_params.get('page', 1)}"
+        return hashlib.md5(position.encode()).hexdigest()
+
+    def _generation_keys(self, user, is_moderator):
+        if user is None:
+            return [PUBLIC_GENERATION]
+        if is_moderator:
+            return [ALL_GENERATION]
+        return [ALL_GENERATION, user_generation_key(user.id)]
+
+    def _format_key(self, user, is_moderator, generations, position):
+        if user is None:
+            return f'feed:page:anon:{generations[0]}:{position}'
+        if is_moderator:
+            return f'feed:page:all:{generations[0]}:{position}'
+        return f'feed:page:user:{user.id}:{generations[0]}:{generations[1]}:{position}'
+
+    def page_key(self, user, is_moderator, query_params):
+        """
+        Ключ страницы: общий для анонимов и для модераторов,
+        персональный для пользователей с фильтрацией по спискам
+        """
+        generations = self._generations(self._generation_keys(user, is_moderator))
+        return self._format_key(user, is_moderator, generations, self._position(query_params))
+
+    def _count(self, data):
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def get(self, key):
+        return self._count(self.cache.get(key))
+
+    def set(self, key, data):
+        self.cache.set(key, data, timeout=self.timeout)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+
+feed_cache = FeedCache()
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from .models import BlogCounter
+
+
+def _feed_stamps(user, is_moderator, **extra):
+    """
+    Запрос версии ленты: версия блогов (публичных для анонима) и для
+    пользователя с фильтрацией — время изменения его списков. Одна строка по PK.
+    extra — дополнительные выражения, их значения идут в конце строки.
+    """
+    if user is None:
+        stamps, fields = BlogCounter.objects.filter(name=BlogCounter.PUBLIC_VERSION), ['value', 'updated_at']
+    elif is_moderator:
+        stamps, fields = BlogCounter.objects.filter(name=BlogCounter.VERSION), ['value', 'updated_at']
+    else:
+        lists_changed_at = get_user_model().objects.filter(id=user.id).values('lists_changed_at')[:1]
+        stamps = BlogCounter.objects.filter(name=BlogCounter.VERSION).annotate(
+            lists_changed_at=models.Subquery(lists_changed_at)
+        )
+        fields = ['value', 'updated_at', 'lists_changed_at']
+    return stamps.annotate(**extra).values_list(*fields, *extra)
+
+
+def _scope(user, is_moderator):
+    return 'anon' if user is None else ('all' if is_moderator else f'user:{user.id}')
+
+
+def _validators(scope, query_params, stamp):
+    if stamp is None:
+        return None, None
+    version, updated_at, *lists_changed_at = stamp
+    lists_changed_at = lists_changed_at[0] if lists_changed_at else None
+    position = f"cursor:{query_params.get('cursor')}" if 'cursor' in query_params else f"page:{query_params.get('page', 1)}"
+    digest = hashlib.md5(f'{scope}:{version}:{lists_changed_at}:{position}'.encode()).hexdigest()
+    last_modified = max(filter(None, (updated_at, lists_changed_at)))
+    return f'"{digest}"', last_modified
+
+
+def feed_validators(user, is_moderator, query_params):
+    """
+    (ETag, Last-Modified) страницы ленты без построения ответа.
+    Версия блогов растет при создании, изменении и удалении блога и при смене
+    username автора (blogs.signals), время списков — при изменении списков.
+    (None, None), если версии еще нет (миграции не применены).
+    """
+    return _validators(
+        _scope(user, is_moderator), query_params, _feed_stamps(user, is_moderator).first()
+    )
+
+
+def user_blogs_validators(author_id, user, is_moderator, query_params):
+    """
+    (ETag, Last-Modified) страницы блогов автора. Видимость зависит от списков
+    автора, а их изменение меняет и время списков зрителя (touch_lists),
+    поэтому хватает версии ленты пользователя. (None, None) и для
+    несуществующего автора — тогда представление отвечает 404.
+    """
+    author = get_user_model().objects.filter(id=author_id)
+    stamp = _feed_stamps(user, is_moderator, author_exists=models.Exists(author)).first()
+    if not stamp or not stamp[-1]:
+        return None, None
+    return _validators(f'author:{author_id}:{_scope(user, is_moderator)}', query_params, stamp[:-1])
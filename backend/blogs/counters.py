@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.acl import acl_graph
+from accounts.user_cache import user_cache
+from .models import Blog, BlogCounter
+
+# Максимум авторов в списках, для которых count ленты считается по счетчикам
+COUNTER_AUTHORS_LIMIT = 500
+
+
+def apply_blog_delta(author_id, total, public):
+    """Атомарное изменение счетчиков автора и глобальных счетчиков"""
+    User = get_user_model()
+    User.objects.filter(id=author_id).update(
+        blog_count=models.F('blog_count') + total,
+        public_blog_count=models.F('public_blog_count') + public
+    )
+    if total:
+        BlogCounter.objects.filter(name=BlogCounter.TOTAL).update(value=models.F('value') + total)
+    if public:
+        BlogCounter.objects.filter(name=BlogCounter.PUBLIC).update(value=models.F('value') + public)
+    evict_users(author_id)
+
+
+def evict_users(*user_ids):
+    """
+    update() не отправляет post_save: запись кэша пользователей сбрасывается
+    после фиксации транзакции, чтобы ее не перечитали до коммита
+    """
+    transaction.on_commit(lambda: user_cache.invalidate(*user_ids))
+
+
+def bump_feed_version(public):
+    """Новая версия ленты (ETag/Last-Modified); изменение публичного блога меняет и ленту анонимов"""
+    names = [BlogCounter.VERSION, BlogCounter.PUBLIC_VERSION] if public else [BlogCounter.VERSION]
+    BlogCounter.objects.filter(name__in=names).update(value=models.F('value') + 1, updated_at=timezone.now())
+
+
+def touch_lists(*user_ids):
+    """Списки пользователей изменились — меняется версия их персональных лент"""
+    get_user_model().objects.filter(id__in=user_ids).update(lists_changed_at=timezone.now())
+    evict_users(*user_ids)
+
+
+def global_count(name):
+    return BlogCounter.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def user_blogs_count(target_user, include_private):
+    """Количество блогов автора, видимых зрителю"""
+    return target_user.blog_count if include_private else target_user.public_blog_count
+
+
+def feed_count(user):
+    """
+    Количество блогов в отфильтрованной ленте пользователя по счетчикам:
+    все публичные минус публичные блоги заблокированных авторов
+    плюс приватные блоги авторов, добавивших пользователя в белый список.
+    Возвращает (count, estimated); count=None — нужен точный COUNT(*).
+    При длинных списках и BLOG_FEED_ESTIMATE_COUNTS — оценка числом публичных блогов.
+    """
+    entry = acl_graph.user_entry(user)
+    blocked = set(entry.blacklist).union(entry.blacklisted_by)
+    private_authors = set(entry.whitelisted_by)
+    private_authors.add(user.id)
+    private_authors -= blocked
+
+    if len(blocked) + len(private_authors) > COUNTER_AUTHORS_LIMIT:
+        if getattr(settings, 'BLOG_FEED_ESTIMATE_COUNTS', False):
+            return global_count(BlogCounter.PUBLIC), True
+        return None, False
+
+    User = get_user_model()
+    totals = User.objects.filter(id__in=blocked | private_authors).aggregate(
+        blocked_public=Coalesce(
+            models.Sum('public_blog_count', filter=models.Q(id__in=blocked)), 0
+        ),
+        allowed_private=Coalesce(
+            models.Sum(
+                models.F('blog_count') - models.F('public_blog_count'),
+                filter=models.Q(id__in=private_authors)
+            ), 0
+        ),
+    )
+    count = global_count(BlogCounter.PUBLIC) - totals['blocked_public'] + totals['allowed_private']
+    return max(count, 0), False
+
+
+@transaction.atomic
+def reconcile_counters():
+    """Пересчет счетчиков по фактическим данным, возвращает число исправленных пользователей"""
+    User = get_user_model()
+    per_author = Blog.objects.filter(author=models.OuterRef('pk')).order_by().values('author')
+    actual = User.objects.annotate(
+        actual_blog_count=Coalesce(
+            models.Subquery(per_author.annotate(c=models.Count('id')).values('c')), 0
+        ),
+        actual_public_blog_count=Coalesce(
+            models.Subquery(per_author.annotate(c=models.Count('id', filter=models.Q(is_private=False))).values('c')), 0
+        ),
+    )
+    drifted = actual.exclude(
+        blog_count=models.F('actual_blog_count'), public_blog_count=models.F('actual_public_blog_count')
+    )
+    fixed = 0
+    for user_id, blog_count, public_blog_count in drifted.values_list(
+        'id', 'actual_blog_count', 'actual_public_blog_count'
+    ).iterator():
+        User.objects.filter(id=user_id).update(blog_count=blog_count, public_blog_count=public_blog_count)
+        evict_users(user_id)
+        fixed += 1
+
+    BlogCounter.objects.update_or_create(name=BlogCounter.TOTAL, defaults={'value': Blog.objects.count()})
+    BlogCounter.objects.update_or_create(
+        name=BlogCounter.PUBLIC, defaults={'value': Blog.objects.filter(is_private=False).count()}
+    )
+    return fixed
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from blogs.timeline import drop_timeline, rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Построение материализованных лент для выбранных пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', default=[], help='ID пользователя (можно несколько)')
+        parser.add_argument('--min-list-size', type=int, help='Пользователи с суммарным размером списков не меньше N')
+        parser.add_argument('--existing', action='store_true', help='Перестроить все уже материализованные ленты')
+        parser.add_argument('--drop', action='store_true', help='Удалить ленты выбранных пользователей')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.none()
+        if options['user']:
+            users |= User.objects.filter(id__in=options['user'])
+        if options['min_list_size'] is not None:
+            heavy = User.objects.annotate(
+                list_size=Count('blacklist', distinct=True) + Count('blacklisted_by', distinct=True)
+                + Count('whitelisted_by', distinct=True)
+            ).filter(list_size__gte=options['min_list_size'])
+            users |= User.objects.filter(id__in=heavy.values('id'))
+        if options['existing']:
+            users |= User.objects.filter(has_timeline=True)
+        if not (options['user'] or options['min_list_size'] is not None or options['existing']):
+            raise CommandError('Укажите --user, --min-list-size или --existing')
+
+        count = 0
+        for user in users.distinct().iterator():
+            if options['drop']:
+                drop_timeline(user)
+            else:
+                rebuild_timeline(user)
+            count += 1
+        action = 'удалено' if options['drop'] else 'построено'
+        self.stdout.write(self.style.SUCCESS(f'Лент {action}: {count}'))
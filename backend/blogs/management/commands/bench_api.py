@@ -0,0 +1,235 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.authentication import generate_jwt_token
+from blogs.cache import feed_cache
+from blogs.models import Blog
+
+SCENARIOS = (
+    'feed-anon', 'feed-user', 'feed-moderator', 'feed-cursor', 'user-blogs',
+    'profile', 'login', 'list-management',
+)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class TestClientTransport:
+    """Запросы через django.test.Client в этом процессе; считает SQL-запросы"""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, url, token=None, body=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.generic(
+                method, url, json.dumps(body) if body is not None else '',
+                content_type='application/json', headers=headers
+            )
+        return response.status_code, len(queries)
+
+
+class HTTPTransport:
+    """Запросы к запущенному серверу (runserver, gunicorn, uvicorn); SQL-запросы не видны"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, token=None, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + url, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as exc:
+            return exc.code, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон реальных endpoints (лента анонима/пользователя/модератора, блоги автора, '
+        'профиль, логин, управление списками) через тестовый клиент или локальный сервер. '
+        'Результат — JSON с пропускной способностью, p50/p95/p99 и числом SQL-запросов по сценариям, '
+        'пригодный для сравнения между коммитами. Данные — seed_blogs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Список через запятую')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=10, help='Запросов прогрева на сценарий')
+        parser.add_argument('--page', type=int, default=1, help='Номер страницы ленты')
+        parser.add_argument('--prefix', default='seed', help='Префикс пользователей seed_blogs')
+        parser.add_argument('--password', default='seed-password', help='Пароль пользователей seed_blogs (для login)')
+        parser.add_argument('--base-url', help='Адрес запущенного сервера вместо тестового клиента')
+        parser.add_argument('--concurrency', type=int, default=1, help='Потоков (только с --base-url)')
+        parser.add_argument('--with-cache', action='store_true', help='Не отключать кэш страниц ленты (работает только с общим бэкендом кэша)')
+        parser.add_argument('--output', help='Записать JSON в файл')
+        parser.add_argument('--compare', help='JSON прошлого прогона: вывести изменения p50/p99/rps')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(unknown)}')
+        if options['concurrency'] > 1 and not options['base_url']:
+            raise CommandError('--concurrency больше 1 поддерживается только с --base-url')
+
+        actors = self.actors(options['prefix'])
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['with_cache']:
+            overrides['BLOG_FEED_CACHE_TIMEOUT'] = 0
+
+        results = []
+        with override_settings(**overrides):
+            transport = HTTPTransport(options['base_url']) if options['base_url'] else TestClientTransport()
+            # На LocMemCache кэш ленты отключен и с --with-cache
+            cache_enabled = feed_cache.enabled
+            for name in names:
+                requests = list(self.scenario(name, actors, options))
+                self.run(transport, requests, options['warmup'], options['concurrency'])
+                results.append({'scenario': name, **self.run(
+                    transport, requests, options['requests'], options['concurrency']
+                )})
+
+        report = {
+            'revision': git_revision(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'transport': 'http' if options['base_url'] else 'test-client',
+            'concurrency': options['concurrency'],
+            'feed_cache': cache_enabled,
+            'users': get_user_model().objects.count(),
+            'blogs': Blog.objects.count(),
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def actors(self, prefix):
+        """Зрители: пользователь с самыми длинными списками, модератор и самый плодовитый автор"""
+        User = get_user_model()
+        seeded = User.objects.filter(username__startswith=f'{prefix}-')
+        author = seeded.order_by('-blog_count', 'id').first()
+        if author is None:
+            raise CommandError(f'Нет пользователей с префиксом {prefix!r}: запустите seed_blogs')
+        user = seeded.filter(role=User.Role.USER).annotate(
+            list_size=Count('blacklist', distinct=True) + Count('whitelisted_by', distinct=True)
+        ).order_by('-list_size', 'id').first() or author
+        moderator = seeded.filter(role=User.Role.MODERATOR).first()
+        # Добавление в черный список убирает из белого — такие пользователи не подходят
+        targets = list(
+            seeded.exclude(id=user.id).exclude(blacklisted_by=user).exclude(whitelisted_by=user)
+            .values_list('id', flat=True)[:50]
+        )
+        return {'user': user, 'moderator': moderator, 'author': author, 'targets': targets}
+
+    def scenario(self, name, actors, options):
+        """Запросы сценария (метод, URL, токен, тело) — повторяются по кругу; list-management добавляет и удаляет"""
+        user, token = actors['user'], generate_jwt_token(actors['user'])
+        feed = f"/api/blogs/feed/?page={options['page']}"
+        if name == 'feed-anon':
+            yield 'GET', feed, None, None
+        elif name == 'feed-user':
+            yield 'GET', feed, token, None
+        elif name == 'feed-moderator':
+            if actors['moderator'] is None:
+                raise CommandError('Нет модератора: seed_blogs --moderators 1')
+            yield 'GET', feed, generate_jwt_token(actors['moderator']), None
+        elif name == 'feed-cursor':
+            yield 'GET', '/api/blogs/feed/?cursor=', token, None
+        elif name == 'user-blogs':
+            yield 'GET', f"/api/blogs/user/id/{actors['author'].id}/blogs/?page=1", token, None
+        elif name == 'profile':
+            yield 'GET', f"/api/accounts/profile/{actors['author'].username}/", token, None
+        elif name == 'login':
+            yield 'POST', '/api/accounts/login/', None, {'email': user.email, 'password': options['password']}
+        elif name == 'list-management':
+            if not actors['targets']:
+                raise CommandError('Нет пользователей для добавления в список')
+            for target in actors['targets']:
+                yield 'POST', f'/api/accounts/lists/blacklist/{target}/', token, None
+                yield 'DELETE', f'/api/accounts/lists/blacklist/{target}/', token, None
+
+    def run(self, transport, requests, count, concurrency):
+        def one(index):
+            method, url, token, body = requests[index % len(requests)]
+            started = time.perf_counter()
+            status, queries = transport.request(method, url, token, body)
+            return time.perf_counter() - started, status, queries
+
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(concurrency) as executor:
+                samples = list(executor.map(one, range(count)))
+        else:
+            samples = [one(index) for index in range(count)]
+        elapsed = time.perf_counter() - started
+        timings = [sample[0] for sample in samples]
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+        return {
+            'requests': count,
+            'rps': round(count / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+            'queries_avg': round(statistics.mean(queries), 2) if queries else None,
+            'queries_max': max(queries) if queries else None,
+            'statuses': sorted({sample[1] for sample in samples}),
+        }
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            baseline = {row['scenario']: row for row in json.load(file)['results']}
+        self.stderr.write(f"{'scenario':<16} {'p50':>8} {'p99':>8} {'rps':>8} {'queries':>8}")
+        for row in results:
+            before = baseline.get(row['scenario'])
+            if before is None:
+                continue
+
+            def ratio(key):
+                if not before.get(key) or row.get(key) is None:
+                    return '-'
+                return f'{row[key] / before[key]:.2f}x'
+
+            self.stderr.write(
+                f"{row['scenario']:<16} {ratio('p50_ms'):>8} {ratio('p99_ms'):>8} "
+                f"{ratio('rps'):>8} {ratio('queries_avg'):>8}"
+            )
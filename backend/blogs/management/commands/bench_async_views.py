@@ -0,0 +1,102 @@
+import asyncio
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+
+from accounts.authentication import generate_jwt_token
+
+# (название, синхронный URL, асинхронный URL)
+ENDPOINTS = {
+    'profile': ('/api/accounts/profile/{username}/', '/api/accounts/async/profile/{username}/'),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(url, headers, requests, concurrency):
+    """requests запросов через ASGI-обработчик, не более concurrency одновременно"""
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+    statuses = set()
+    in_flight = 0
+    peak = 0
+
+    async def one():
+        nonlocal in_flight, peak
+        async with semaphore:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            timings.append(time.perf_counter() - started)
+            statuses.add(response.status_code)
+            in_flight -= 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+        'rps': round(requests / elapsed, 1),
+        'peak_in_flight': peak,
+        'statuses': sorted(statuses),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение задержек (p50/p99) и пропускной способности синхронных APIView '
+        'и асинхронных представлений под одинаковой нагрузкой через ASGI-обработчик. '
+        'Нужна файловая или серверная БД: async ORM работает в отдельном потоке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждый замер')
+        parser.add_argument('--concurrency', type=int, default=20, help='Одновременных запросов')
+        parser.add_argument('--user', type=int, help='id зрителя (по умолчанию — первый пользователь)')
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='Список через запятую')
+        parser.add_argument('--json', action='store_true', help='Результат в JSON')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        viewer = User.objects.filter(id=options['user']).first() if options['user'] else User.objects.order_by('id').first()
+        if viewer is None:
+            raise CommandError('Нет пользователей: заполните БД (например, seed_blogs)')
+        names = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in ENDPOINTS]
+        if unknown:
+            raise CommandError(f'Неизвестные endpoints: {", ".join(unknown)}')
+
+        headers = {'Authorization': f'Bearer {generate_jwt_token(viewer)}'}
+        params = {'username': viewer.username}
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+
+        results = []
+        with override_settings(**overrides):
+            for name in names:
+                for mode, url in zip(('sync', 'async'), ENDPOINTS[name]):
+                    url = url.format(**params)
+                    # Прогрев: кэши пользователя, списков и соединения
+                    asyncio.run(run_load(url, headers, options['concurrency'], options['concurrency']))
+                    stats = asyncio.run(run_load(url, headers, options['requests'], options['concurrency']))
+                    results.append({'endpoint': name, 'mode': mode, **stats})
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<12} {'mode':<6} {'p50 ms':>9} {'p99 ms':>9} {'rps':>8} {'peak':>5}  statuses")
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<12} {row['mode']:<6} {row['p50_ms']:>9} {row['p99_ms']:>9} "
+                f"{row['rps']:>8} {row['peak_in_flight']:>5}  {row['statuses']}"
+            )
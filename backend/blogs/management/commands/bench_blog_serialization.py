@@ -0,0 +1,98 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blogs.models import Blog
+from blogs.serializers import BlogSerializer, blog_list_values
+
+
+class Rollback(Exception):
+    pass
+
+
+def serializer_path(blogs, size):
+    """Прежний путь: экземпляры моделей + ModelSerializer"""
+    return BlogSerializer(list(blogs.select_related('author')[:size]), many=True).data
+
+
+def projection_path(blogs, size):
+    """Проекция values() с JOIN на username автора"""
+    return list(blog_list_values(blogs)[:size])
+
+
+def measure(func, blogs, size, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(blogs, size)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(blogs, size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'per_item_us': round(statistics.median(timings) / size * 1e6, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Микробенчмарк сериализации списка блогов: ModelSerializer против проекции values()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,100,1000', help='Размеры страниц через запятую')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        results = []
+        try:
+            # Данные создаются во временной транзакции и откатываются
+            with transaction.atomic():
+                self.seed(max(sizes))
+                blogs = Blog.objects.filter(title__startswith='bench-').order_by('-id')
+                for size in sizes:
+                    serializer = measure(serializer_path, blogs, size, options['repeat'])
+                    projection = measure(projection_path, blogs, size, options['repeat'])
+                    results.append({
+                        'size': size,
+                        'serializer': serializer,
+                        'projection': projection,
+                        'speedup': round(serializer['median_ms'] / max(projection['median_ms'], 1e-6), 2),
+                    })
+                raise Rollback
+        except Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'size':>6} {'serializer ms':>14} {'projection ms':>14} {'speedup':>8} {'peak KB ser/proj':>18}")
+        for row in results:
+            self.stdout.write(
+                f"{row['size']:>6} {row['serializer']['median_ms']:>14} {row['projection']['median_ms']:>14} "
+                f"{row['speedup']:>7}x {row['serializer']['peak_kb']:>8}/{row['projection']['peak_kb']:<8}"
+            )
+
+    def seed(self, count):
+        User = get_user_model()
+        authors = User.objects.bulk_create([
+            User(username=f'bench-author-{i}', email=f'bench-author-{i}@example.com') for i in range(50)
+        ])
+        Blog.objects.bulk_create([
+            Blog(
+                title=f'bench-{i}',
+                description='Lorem ipsum dolor sit amet ' * 8,
+                is_private=i % 5 == 0,
+                author=authors[i % len(authors)]
+            )
+            for i in range(count)
+        ])
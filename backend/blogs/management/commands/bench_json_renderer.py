@@ -0,0 +1,103 @@
+import io
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import CustomUser
+from accounts.serializers import UserProfileSerializer
+from backend.renderers import FastJSONParser, FastJSONRenderer, orjson
+from blogs.models import Blog
+from blogs.serializers import blog_list_values
+
+
+def feed_payload(size):
+    """Страница ленты в формате paginated_blogs_data; строки повторяются до нужного размера"""
+    rows = list(blog_list_values(Blog.objects.order_by('-id'))[:size])
+    if not rows:
+        raise CommandError('Нет блогов: заполните БД (например, seed_blogs)')
+    rows = (rows * (size // len(rows) + 1))[:size]
+    return {'results': rows, 'count': size, 'num_pages': 1, 'page': 1}
+
+
+def profiles_payload(size):
+    """Профили пользователей: даты и время проходят через JSONEncoder DRF"""
+    users = list(CustomUser.objects.order_by('id')[:size])
+    return {'results': UserProfileSerializer(users * (size // max(len(users), 1) + 1), many=True).data[:size]}
+
+
+# Запись экспоненты у orjson и json различается (1e16 и 1e+16), значения — нет
+FLOAT_CASES = [0.1, -0.0, 1.5e-7, 1e16, -2.5e-300, 1e300, 2 ** 0.5, 123456789.125]
+
+
+def check_floats(standard, fast):
+    """Числа с плавающей точкой: те же значения, NaN и бесконечности — ValueError у обоих"""
+    data = {'floats': FLOAT_CASES, 'nested': [{'value': value} for value in FLOAT_CASES]}
+    if json.loads(fast.render(data)) != json.loads(standard.render(data)):
+        raise CommandError('floats: значения FastJSONRenderer отличаются от JSONRenderer')
+    for value in (float('nan'), float('inf'), float('-inf')):
+        for renderer in (standard, fast):
+            try:
+                renderer.render({'results': [{'value': value}]})
+            except ValueError:
+                continue
+            raise CommandError(f'floats: {type(renderer).__name__} закодировал {value} без ошибки')
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+class Command(BaseCommand):
+    help = 'Сравнение JSONRenderer/JSONParser DRF и FastJSONRenderer/FastJSONParser на данных ленты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,200,2000', help='Размеры страниц через запятую')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--json', action='store_true', help='Результат в JSON')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson не установлен: FastJSONRenderer использует стандартный json')
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        standard, fast = JSONRenderer(), FastJSONRenderer()
+        check_floats(standard, fast)
+        results = []
+        for name, build in (('feed', feed_payload), ('profiles', profiles_payload)):
+            for size in sizes:
+                data = build(size)
+                body = standard.render(data)
+                if fast.render(data) != body:
+                    raise CommandError(f'{name}[{size}]: вывод FastJSONRenderer отличается от JSONRenderer')
+                if FastJSONParser().parse(io.BytesIO(body)) != JSONParser().parse(io.BytesIO(body)):
+                    raise CommandError(f'{name}[{size}]: результат FastJSONParser отличается от JSONParser')
+                row = {
+                    'payload': name,
+                    'size': size,
+                    'bytes': len(body),
+                    'render_ms': median_ms(lambda: standard.render(data), options['repeat']),
+                    'fast_render_ms': median_ms(lambda: fast.render(data), options['repeat']),
+                    'parse_ms': median_ms(lambda: JSONParser().parse(io.BytesIO(body)), options['repeat']),
+                    'fast_parse_ms': median_ms(lambda: FastJSONParser().parse(io.BytesIO(body)), options['repeat']),
+                }
+                results.append(row)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'payload':<9} {'size':>6} {'bytes':>9} {'render':>9} {'fast':>9} {'parse':>9} {'fast':>9}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['payload']:<9} {row['size']:>6} {row['bytes']:>9} {row['render_ms']:>9} "
+                f"{row['fast_render_ms']:>9} {row['parse_ms']:>9} {row['fast_parse_ms']:>9}"
+            )
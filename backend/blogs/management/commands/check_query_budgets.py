@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from blogs.query_budgets import SETTINGS, measure_budgets, seed
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверка бюджетов SQL-запросов (атрибут query_budget представлений) на тестовых данных '
+        'во временной транзакции. Каждый запрос замеряется с пустыми кэшами процесса (холодный путь). '
+        'Ошибка, если представление выполнило больше запросов, чем объявлено '
+        '(то же, что blogs.tests.QueryBudgetTests, но на указанной БД).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Результат в JSON')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with override_settings(**SETTINGS), transaction.atomic():
+                results = measure_budgets(seed())
+                raise Rollback
+        except Rollback:
+            pass
+
+        failures = [row for row in results if row['error'] or row['status'] >= 400]
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            for row in results:
+                style = self.style.ERROR if row in failures else self.style.SUCCESS
+                mark = 'FAIL' if row in failures else 'ok  '
+                status = f" (HTTP {row['status']})" if row['status'] >= 400 else ''
+                warm = f" (прогретые кэши: {row['warm_queries']})" if row['warm_queries'] is not None else ''
+                self.stdout.write(style(
+                    f"{mark} {row['case']:<22} {row['view']:<34} {row['queries']:>3} / {row['budget']}{warm}{status}"
+                ))
+        if failures:
+            raise CommandError('Превышены бюджеты запросов:\n' + '\n\n'.join(
+                row['error'] or f"{row['case']}: HTTP {row['status']}" for row in failures
+            ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blogs.query_plans import VENDORS, explain_user, hot_queries, index_only, plan_problems
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверка планов горячих запросов на указанной БД: ошибка при полном переборе таблицы '
+        'или временной сортировке (то же, что blogs.tests.QueryPlanTests, но на реальных данных)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--verbose-plans', action='store_true', help='Печатать планы целиком')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor not in VENDORS:
+            raise CommandError(f'Проверка планов не поддерживается для {connection.vendor}')
+
+        failures = []
+        with index_only(connection):
+            for name, queryset, allowed_scans in hot_queries(explain_user()):
+                plan, problems = plan_problems(connection, queryset, allowed_scans)
+                if options['verbose_plans']:
+                    self.stdout.write(f'--- {name}\n{plan}')
+                if problems:
+                    failures.append(f"{name}: {', '.join(problems)}")
+                    self.stdout.write(self.style.ERROR(f"FAIL {name}: {', '.join(problems)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok   {name}'))
+
+        if failures:
+            raise CommandError('Регрессия планов запросов:\n' + '\n'.join(failures))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.profiling import MODES, PROFILE_HEADER, profiling_token
+
+
+class Command(BaseCommand):
+    help = 'Подписанное значение заголовка X-Profile для профилирования запроса (нужен PROFILING_ENABLED)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, help='Режим профилирования (по умолчанию PROFILING_MODE)')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            self.stderr.write(self.style.WARNING('PROFILING_ENABLED=False: заголовок будет проигнорирован'))
+        self.stdout.write(f'{PROFILE_HEADER}: {profiling_token(options["mode"])}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blogs.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчет денормализованных счетчиков блогов по фактическим данным'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено пользователей: {fixed}'))
@@ -0,0 +1,176 @@
+import itertools
+import random
+from array import array
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.utils import timezone
+
+from blogs.cache import feed_cache
+from blogs.counters import bump_feed_version
+from blogs.models import Blog, BlogCounter, Timeline
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud'
+).split()
+
+
+def zipf_weights(size, skew):
+    """Накопленные веса Zipf: skew=0 — равномерно, чем больше skew, тем сильнее перекос к первым"""
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(size)))
+
+
+def blog_plan(seed, count, authors, private_ratio):
+    """
+    Последовательность (индекс автора, приватность) для count блогов.
+    Генератор детерминирован по seed: первый проход считает счетчики авторов,
+    второй с тем же seed создает те же блоги.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.choices(range(len(authors)), cum_weights=authors)[0], rng.random() < private_ratio
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация синтетических пользователей, блогов и черных/белых списков через bulk_create '
+        'с настраиваемым перекосом (популярные авторы, «тяжелые» списки). '
+        'Сигналы не вызываются: счетчики, версии ленты и кэш обновляются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--blogs', type=int, default=10000)
+        parser.add_argument('--moderators', type=int, default=1, help='Сколько пользователей получат роль модератора')
+        parser.add_argument('--private-ratio', type=float, default=0.2, help='Доля приватных блогов')
+        parser.add_argument('--author-skew', type=float, default=1.0, help='Показатель Zipf для авторства блогов')
+        parser.add_argument('--blacklist-avg', type=float, default=5, help='Средний размер черного списка')
+        parser.add_argument('--whitelist-avg', type=float, default=3, help='Средний размер белого списка')
+        parser.add_argument(
+            '--list-skew', type=float, default=1.0,
+            help='Показатель Zipf для выбора тех, кого добавляют в списки (размеры списков — экспоненциальные)'
+        )
+        parser.add_argument('--max-list-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Префикс username/email создаваемых пользователей')
+        parser.add_argument('--password', default='seed-password', help='Пароль всех создаваемых пользователей')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератора для воспроизводимости')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        prefix = options['prefix']
+        if options['users'] < 1:
+            raise CommandError('--users должно быть больше 0')
+        if User.objects.filter(username=f'{prefix}-0').exists():
+            raise CommandError(f'Пользователи с префиксом {prefix!r} уже есть: укажите другой --prefix')
+
+        authors = zipf_weights(options['users'], options['author_skew'])
+        blog_counts = array('L', bytes(array('L').itemsize * options['users']))
+        public_counts = array('L', bytes(array('L').itemsize * options['users']))
+        for author, is_private in blog_plan(options['seed'], options['blogs'], authors, options['private_ratio']):
+            blog_counts[author] += 1
+            if not is_private:
+                public_counts[author] += 1
+
+        user_ids = self.create_users(options, blog_counts, public_counts)
+        self.stdout.write(f'Пользователей: {len(user_ids)}')
+        public = self.create_blogs(options, authors, user_ids)
+        self.stdout.write(f'Блогов: {options["blogs"]} (публичных {public})')
+        listed = self.create_lists(options, user_ids)
+        self.stdout.write(f'Записей в списках: {listed}')
+
+        # Счетчики авторов заданы при создании, глобальные и версии ленты — здесь
+        BlogCounter.objects.filter(name=BlogCounter.TOTAL).update(value=models.F('value') + options['blogs'])
+        BlogCounter.objects.filter(name=BlogCounter.PUBLIC).update(value=models.F('value') + public)
+        bump_feed_version(public=True)
+        feed_cache.bump_blogs(public=True)
+        if options['blogs'] and Timeline.objects.exists():
+            self.stdout.write(self.style.WARNING(
+                'Материализованные ленты не содержат новых блогов: backfill_timelines --existing'
+            ))
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def create_users(self, options, blog_counts, public_counts):
+        User = get_user_model()
+        prefix = options['prefix']
+        rng = random.Random(options['seed'] + 1)
+        moderators = set(rng.sample(range(options['users']), min(options['moderators'], options['users'])))
+        # Хэш один на всех: PBKDF2 на миллион пользователей занял бы часы
+        password = make_password(options['password'])
+        now = timezone.now()
+        last_id = User.objects.aggregate(last=models.Max('id'))['last'] or 0
+
+        def build(index):
+            return User(
+                username=f'{prefix}-{index}',
+                email=f'{prefix}-{index}@example.com',
+                password=password,
+                role=User.Role.MODERATOR if index in moderators else User.Role.USER,
+                blog_count=blog_counts[index],
+                public_blog_count=public_counts[index],
+                lists_changed_at=now,
+            )
+
+        for start in range(0, options['users'], options['batch_size']):
+            stop = min(start + options['batch_size'], options['users'])
+            User.objects.bulk_create([build(index) for index in range(start, stop)])
+        # id читаются запросом: не все СУБД возвращают их из bulk_create
+        ids = User.objects.filter(id__gt=last_id, username__startswith=f'{prefix}-').values_list('id', 'username')
+        by_index = {int(username.rsplit('-', 1)[1]): user_id for user_id, username in ids.iterator()}
+        return array('q', (by_index[index] for index in range(options['users'])))
+
+    def create_blogs(self, options, authors, user_ids):
+        rng = random.Random(options['seed'] + 2)
+        public = 0
+        plan = blog_plan(options['seed'], options['blogs'], authors, options['private_ratio'])
+        while batch := list(itertools.islice(plan, options['batch_size'])):
+            blogs = []
+            for author, is_private in batch:
+                public += not is_private
+                blogs.append(Blog(
+                    title=' '.join(rng.choices(WORDS, k=4)).capitalize(),
+                    description=' '.join(rng.choices(WORDS, k=rng.randint(20, 80))),
+                    is_private=is_private,
+                    author_id=user_ids[author],
+                ))
+            Blog.objects.bulk_create(blogs)
+        return public
+
+    def create_lists(self, options, user_ids):
+        User = get_user_model()
+        rng = random.Random(options['seed'] + 3)
+        targets = zipf_weights(len(user_ids), options['list_skew'])
+        population = range(len(user_ids))
+        created = 0
+
+        def sample(average):
+            if average <= 0:
+                return set()
+            size = min(int(rng.expovariate(1 / average)), options['max_list_size'], len(user_ids) - 1)
+            return set(rng.choices(population, cum_weights=targets, k=size))
+
+        black_rows, white_rows = [], []
+        for owner in population:
+            blacklist = sample(options['blacklist_avg'])
+            # Пользователь не бывает одновременно в обоих списках владельца
+            whitelist = sample(options['whitelist_avg']) - blacklist
+            blacklist.discard(owner)
+            whitelist.discard(owner)
+            black_rows.extend(
+                User.blacklist.through(from_customuser_id=user_ids[owner], to_customuser_id=user_ids[target])
+                for target in blacklist
+            )
+            white_rows.extend(
+                User.whitelist.through(from_customuser_id=user_ids[owner], to_customuser_id=user_ids[target])
+                for target in whitelist
+            )
+            if len(black_rows) + len(white_rows) >= options['batch_size'] or owner == population[-1]:
+                with transaction.atomic():
+                    User.blacklist.through.objects.bulk_create(black_rows, batch_size=options['batch_size'])
+                    User.whitelist.through.objects.bulk_create(white_rows, batch_size=options['batch_size'])
+                created += len(black_rows) + len(white_rows)
+                black_rows, white_rows = [], []
+        return created
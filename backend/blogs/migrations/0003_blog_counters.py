@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Blog = apps.get_model('blogs', 'Blog')
+    BlogCounter = apps.get_model('blogs', 'BlogCounter')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    per_author = Blog.objects.filter(author=OuterRef('pk')).order_by().values('author')
+    User.objects.update(
+        blog_count=Coalesce(Subquery(per_author.annotate(c=Count('id')).values('c')), 0),
+        public_blog_count=Coalesce(
+            Subquery(per_author.annotate(c=Count('id', filter=Q(is_private=False))).values('c')), 0
+        ),
+    )
+    BlogCounter.objects.update_or_create(name='blogs', defaults={'value': Blog.objects.count()})
+    BlogCounter.objects.update_or_create(
+        name='public_blogs', defaults={'value': Blog.objects.filter(is_private=False).count()}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_blog_counters'),
+        ('blogs', '0002_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogCounter',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
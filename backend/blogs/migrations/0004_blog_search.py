@@ -0,0 +1,90 @@
+from django.db import migrations
+
+# В SQLite изменение полей blogs_blog пересоздает таблицу и удаляет триггеры:
+# такие миграции должны повторно вызывать create_search_index.
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE blogs_blog_fts USING fts5(
+        title, description,
+        content='blogs_blog', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER blogs_blog_fts_ai AFTER INSERT ON blogs_blog BEGIN
+        INSERT INTO blogs_blog_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER blogs_blog_fts_ad AFTER DELETE ON blogs_blog BEGIN
+        INSERT INTO blogs_blog_fts(blogs_blog_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER blogs_blog_fts_au AFTER UPDATE OF title, description ON blogs_blog BEGIN
+        INSERT INTO blogs_blog_fts(blogs_blog_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO blogs_blog_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO blogs_blog_fts(blogs_blog_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS blogs_blog_fts_au',
+    'DROP TRIGGER IF EXISTS blogs_blog_fts_ad',
+    'DROP TRIGGER IF EXISTS blogs_blog_fts_ai',
+    'DROP TABLE IF EXISTS blogs_blog_fts',
+]
+
+# Выражение должно совпадать с blogs.search.POSTGRES_DOCUMENT, иначе индекс не используется
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX blogs_blog_search_gin ON blogs_blog
+    USING GIN (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS blogs_blog_search_gin',
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+
+def run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        run_statements(schema_editor, SQLITE_FORWARD)
+    elif connection.vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_BACKWARD)
+    elif connection.vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0003_blog_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    BlogCounter = apps.get_model('blogs', 'BlogCounter')
+    for name in ('blogs_version', 'public_blogs_version'):
+        BlogCounter.objects.get_or_create(name=name, defaults={'value': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogcounter',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
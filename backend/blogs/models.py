@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Blog(models.Model):
     title = models.CharField(
@@ -15,5 +16,85 @@ class Blog(models.Model):
         related_name='blogs'
     )
 
+    class Meta:
+        # Частичные индексы: условие is_private=False рендерится как NOT is_private,
+        # по которому обычный индекс неприменим. Блоги автора без фильтра по приватности
+        # обслуживает индекс внешнего ключа author.
+        indexes = [
+            # Лента анонимов: WHERE NOT is_private ORDER BY id DESC
+            models.Index(fields=['id'], condition=models.Q(is_private=False), name='blog_public_id'),
+            # Публичные блоги автора: WHERE author_id = X AND NOT is_private ORDER BY id DESC
+            models.Index(fields=['author', 'id'], condition=models.Q(is_private=False), name='blog_author_public_id'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исходная приватность нужна счетчикам при ее переключении
+        instance._loaded_is_private = instance.__dict__.get('is_private')
+        return instance
+
     def __str__(self):
         return self.title
+
+
+class BlogCounter(models.Model):
+    """
+    Глобальные счетчики блогов для метаданных пагинации
+    и версии ленты (растут при любом изменении блогов) для условных GET
+    """
+    TOTAL = 'blogs'
+    PUBLIC = 'public_blogs'
+    VERSION = 'blogs_version'
+    PUBLIC_VERSION = 'public_blogs_version'
+
+    name = models.CharField(
+        max_length=32,
+        primary_key=True
+    )
+    value = models.BigIntegerField(
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now
+    )
+
+    def __str__(self):
+        return f'{self.name}={self.value}'
+
+
+class Timeline(models.Model):
+    """Материализованная лента зрителя (для пользователей с тяжелой лентой)"""
+    viewer = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timeline'
+    )
+    built_at = models.DateTimeField(
+        auto_now=True
+    )
+
+    def __str__(self):
+        return f'Timeline of {self.viewer_id}'
+
+
+class TimelineEntry(models.Model):
+    """Блог, видимый зрителю материализованной ленты"""
+    # Индекс по viewer покрывается уникальным ограничением (viewer, blog)
+    viewer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        db_index=False
+    )
+    blog = models.ForeignKey(
+        Blog,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['viewer', 'blog'], name='unique_timeline_entry')
+        ]
@@ -0,0 +1,164 @@
+import itertools
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import resolve
+
+from accounts.acl import acl_graph
+from accounts.authentication import generate_jwt_token, generate_refresh_token
+from accounts.user_cache import user_cache
+from backend.querystats import QueryBudgetExceeded, assert_max_queries
+from .models import Blog
+
+PASSWORD = 'Budget-check-password-1'
+NEW_PASSWORD = 'Budget-check-password-2'
+
+# Кэш страниц ленты отключен: проверяется путь с запросами к БД
+SETTINGS = {'ALLOWED_HOSTS': ['testserver'], 'BLOG_FEED_CACHE_TIMEOUT': 0, 'QUERY_STATS_ENABLED': False}
+
+
+def seed():
+    """Пользователи и блоги для cases(); списки зрителя и автора задают разные правила видимости"""
+    User = get_user_model()
+
+    def create(name, **extra):
+        return User.objects.create_user(
+            username=f'budget-{name}', email=f'budget-{name}@example.com', password=PASSWORD, **extra
+        )
+
+    users = {
+        'viewer': create('viewer'),
+        'author': create('author'),
+        'target': create('target'),
+        'moderator': create('moderator', role=User.Role.MODERATOR),
+        'superuser': User.objects.create_superuser(
+            'budget-superuser', 'budget-superuser@example.com', PASSWORD
+        ),
+    }
+    others = [create(f'other-{number}') for number in range(4)]
+    for number in range(60):
+        Blog.objects.create(
+            title=f'budget-{number}', description='budget', is_private=number % 3 == 0,
+            author=(users['author'], *others)[number % 5]
+        )
+    users['viewer'].blacklist.add(others[0])
+    users['author'].whitelist.add(users['viewer'])
+    others[1].blacklist.add(users['viewer'])
+    return users
+
+
+def cases(users, registrations):
+    """
+    (название, метод, URL, пользователь, тело) — последовательность возвращает данные
+    в исходное состояние, поэтому ее можно прогнать дважды.
+    AccountManagementView и UserDeletionView не проверяются: CustomUser.deactivate() нет.
+    Потоковые выгрузки не проверяются: их запросы выполняются при отправке тела.
+    """
+    viewer, author, target = users['viewer'], users['author'], users['target']
+
+    def registration():
+        number = next(registrations)
+        return {
+            'username': f'budget-new-{number}', 'email': f'budget-new-{number}@example.com',
+            'password': PASSWORD, 'password_confirm': PASSWORD,
+        }
+
+    yield 'feed-anonymous', 'GET', '/api/blogs/feed/?page=1', None, None
+    yield 'feed-user', 'GET', '/api/blogs/feed/?page=1', viewer, None
+    yield 'feed-moderator', 'GET', '/api/blogs/feed/?page=1', users['moderator'], None
+    yield 'feed-cursor', 'GET', '/api/blogs/feed/?cursor=', viewer, None
+    yield 'user-blogs', 'GET', f'/api/blogs/user/id/{author.id}/blogs/?page=1', viewer, None
+    yield 'blog-create', 'POST', '/api/blogs/feed/', author, {'title': 'budget-created', 'description': 'budget'}
+    yield 'blog-delete', 'DELETE', '/api/blogs/feed/', author, lambda: {
+        'blog_id': Blog.objects.filter(title='budget-created').values_list('id', flat=True).last()
+    }
+    yield 'register', 'POST', '/api/accounts/register/', None, registration
+    yield 'register-async', 'POST', '/api/accounts/async/register/', None, registration
+    yield 'login', 'POST', '/api/accounts/login/', None, {'email': viewer.email, 'password': PASSWORD}
+    yield 'login-async', 'POST', '/api/accounts/async/login/', None, {'email': viewer.email, 'password': PASSWORD}
+    yield 'logout', 'POST', '/api/accounts/logout/', viewer, None
+    yield 'token-refresh', 'POST', '/api/accounts/token/refresh/', None, lambda: {
+        'refresh_token': generate_refresh_token(viewer)
+    }
+    yield 'profile', 'GET', '/api/accounts/profile/', viewer, None
+    yield 'profile-update', 'PUT', '/api/accounts/profile/', viewer, {'first_name': 'Budget'}
+    yield 'author-profile', 'GET', f'/api/accounts/profile/{author.username}/', viewer, None
+    yield 'author-profile-async', 'GET', f'/api/accounts/async/profile/{author.username}/', viewer, None
+    yield 'list-membership', 'GET', f'/api/accounts/lists/blacklist/{target.id}/', viewer, None
+    yield 'list-add', 'POST', f'/api/accounts/lists/blacklist/{target.id}/', viewer, None
+    yield 'list-remove', 'DELETE', f'/api/accounts/lists/blacklist/{target.id}/', viewer, None
+    yield 'list-bulk-add', 'POST', '/api/accounts/lists/bulk/', viewer, {'whitelist': {'add': [target.id]}}
+    yield 'list-bulk-remove', 'POST', '/api/accounts/lists/bulk/', viewer, {'whitelist': {'remove': [target.id]}}
+    yield 'lists', 'GET', '/api/accounts/lists/', viewer, None
+    yield 'list-page', 'GET', '/api/accounts/lists/blacklist/', viewer, None
+    yield 'role-promote', 'POST', f'/api/accounts/roles/{target.id}/', users['superuser'], None
+    yield 'role-demote', 'DELETE', f'/api/accounts/roles/{target.id}/', users['superuser'], None
+    yield 'moderators', 'GET', '/api/accounts/roles/moderators/', users['superuser'], None
+    yield 'change-password', 'POST', '/api/accounts/change-password/', viewer, {
+        'old_password': PASSWORD, 'new_password': NEW_PASSWORD
+    }
+    yield 'change-password-back', 'POST', '/api/accounts/async/change-password/', viewer, {
+        'old_password': NEW_PASSWORD, 'new_password': PASSWORD
+    }
+
+
+def view_budget(method, url):
+    view_class = resolve(url.split('?')[0]).func.view_class
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        budget = budget.get(method.lower())
+    return f'{view_class.__name__}.{method.lower()}', budget
+
+
+def request(method, url, user, body, budget):
+    """(HTTP-статус, число запросов, текст ошибки при превышении budget или None)"""
+    headers = {'Authorization': f'Bearer {generate_jwt_token(user)}'} if user else {}
+    data = body() if callable(body) else body
+    error = None
+    try:
+        with assert_max_queries(budget if budget is not None else float('inf'), url) as recorder:
+            # Новый клиент на каждый запрос: cookie от login не должны аутентифицировать анонима
+            response = Client().generic(
+                method, url, json.dumps(data) if data is not None else '',
+                content_type='application/json', headers=headers
+            )
+    except QueryBudgetExceeded as exc:
+        error = str(exc)
+    return response.status_code, recorder.count, error
+
+
+def drop_caches(users):
+    """
+    Кэши пользователей и списков пусты, как у нового воркера или после истечения TTL.
+    Из общего уровня кэша пользователей удаляются только записи тестовых пользователей
+    """
+    acl_graph.clear()
+    user_cache.clear_local()
+    user_cache.invalidate(*(user.id for user in users.values()))
+
+
+def measure_budgets(users):
+    """
+    Прогон cases() дважды: первый прогревает импорты и внутренние кэши Django,
+    во втором каждый запрос замеряется с пустыми кэшами (drop_caches) — query_budget
+    представления рассчитан на холодный путь. Для GET дополнительно замеряется
+    повторный запрос с прогретыми кэшами (warm_queries, без проверки бюджета).
+    Вызывать внутри транзакции, которая затем откатывается, с настройками SETTINGS.
+    """
+    results = []
+    registrations = itertools.count()
+    for measure in (False, True):
+        for name, method, url, user, body in cases(users, registrations):
+            label, budget = view_budget(method, url)
+            if not measure:
+                request(method, url, user, body, None)
+                continue
+            drop_caches(users)
+            status, count, error = request(method, url, user, body, budget)
+            warm = request(method, url, user, body, None)[1] if method == 'GET' else None
+            results.append({
+                'case': name, 'view': label, 'status': status,
+                'queries': count, 'warm_queries': warm, 'budget': budget, 'error': error,
+            })
+    return results
@@ -0,0 +1,97 @@
+import re
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+
+from .models import Blog
+from .serializers import blog_list_values
+from .timeline import timeline_blogs
+from .utils import filter_visible_blogs, filter_visible_blogs_by_subqueries
+
+# СУБД, для которых разбираются планы
+VENDORS = ('sqlite', 'postgresql')
+
+PAGE = 21
+
+
+def hot_queries(user):
+    """
+    Запросы горячих путей blogs/views.py и blogs/utils.py.
+    allowed_scans — таблицы, которые допустимо обходить по первичному ключу
+    с ранней остановкой по LIMIT (лента модератора и фильтрованная лента).
+    """
+    User = get_user_model()
+    blogs = Blog.objects.order_by('-id')
+    blacklist = User.blacklist.through.objects
+    whitelist = User.whitelist.through.objects
+    queries = [
+        ('feed-anonymous', blogs.filter(is_private=False), set()),
+        ('feed-anonymous-cursor', blogs.filter(is_private=False, id__lt=1000), set()),
+        ('feed-moderator', blogs, {'blogs_blog'}),
+        ('feed-filtered-inline', filter_visible_blogs(blogs, user), {'blogs_blog'}),
+        ('feed-filtered-subqueries', filter_visible_blogs_by_subqueries(blogs, user), {'blogs_blog'}),
+        ('feed-timeline', timeline_blogs(user), set()),
+        ('feed-timeline-cursor', timeline_blogs(user).filter(id__lt=1000), set()),
+        ('user-blogs-all', blogs.filter(author_id=user.id), set()),
+        ('user-blogs-public', blogs.filter(author_id=user.id, is_private=False), set()),
+        ('user-blogs-cursor', blogs.filter(author_id=user.id, is_private=False, id__lt=1000), set()),
+    ]
+    # Списки блогов читаются проекцией с JOIN на автора, как в paginated_blogs_data
+    queries = [(name, blog_list_values(queryset)[:PAGE], allowed) for name, queryset, allowed in queries]
+    return queries + [
+        ('acl-blacklist', blacklist.filter(from_customuser_id=user.id).values_list('to_customuser_id'), set()),
+        ('acl-blacklisted-by', blacklist.filter(to_customuser_id=user.id).values_list('from_customuser_id'), set()),
+        ('acl-whitelisted-by', whitelist.filter(to_customuser_id=user.id).values_list('from_customuser_id'), set()),
+        ('user-list-page', blacklist.filter(from_customuser_id=user.id, id__lt=1000).order_by('-id')
+            .values_list('id', 'to_customuser__username')[:PAGE], set()),
+    ]
+
+
+def temp_sorts(vendor, plan):
+    """Сортировка во временном B-дереве вместо обхода индекса в нужном порядке"""
+    if vendor == 'sqlite':
+        return 'USE TEMP B-TREE FOR ORDER BY' in plan
+    return False
+
+
+def full_scans(vendor, plan):
+    """Таблицы, которые план читает полным перебором"""
+    if vendor == 'sqlite':
+        # «SCAN t» без «USING ... INDEX»; «SCAN t USING INDEX» — обход индекса
+        return {
+            match.group(1)
+            for line in plan.splitlines()
+            for match in [re.search(r'\bSCAN (\w+)(?! USING)', line)]
+            if match and 'USING' not in line
+        }
+    if vendor == 'postgresql':
+        return set(re.findall(r'Seq Scan on (\w+)', plan))
+    return set()
+
+
+@contextmanager
+def index_only(connection):
+    """На маленьких таблицах PostgreSQL выбирает Seq Scan — запрещаем, чтобы проверить наличие индексов"""
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+        try:
+            yield
+        finally:
+            cursor.execute('RESET enable_seqscan')
+
+
+def plan_problems(connection, queryset, allowed_scans):
+    """(план, проблемы): полный перебор таблиц, кроме allowed_scans, и временная сортировка"""
+    plan = queryset.using(connection.alias).explain()
+    problems = [f'полный перебор {table}' for table in sorted(full_scans(connection.vendor, plan) - allowed_scans)]
+    if temp_sorts(connection.vendor, plan):
+        problems.append('временная сортировка')
+    return plan, problems
+
+
+def explain_user():
+    """Несохраненный пользователь: планы не зависят от данных"""
+    return get_user_model()(id=1, username='explain')
@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+import re
+import time
+
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+
+from .serializers import blog_list_values
+
+FTS_TABLE = 'blogs_blog_fts'
+
+# Выражение документа совпадает с индексом из миграции 0004_blog_search
+POSTGRES_DOCUMENT = (
+    "to_tsvector('simple', coalesce(\"blogs_blog\".\"title\", '') || ' ' "
+    "|| coalesce(\"blogs_blog\".\"description\", ''))"
+)
+
+MAX_QUERY_LENGTH = 200
+MAX_TERMS = 16
+
+# Отсутствие таблицы FTS перепроверяется (секунды): миграция в другом процессе
+# создает ее без перезапуска воркеров
+FTS_RECHECK_INTERVAL = 60
+
+# using -> (таблица FTS есть, время проверки)
+_fts_available = {}
+
+
+def _has_fts_table(connection, using):
+    available, checked_at = _fts_available.get(using, (False, None))
+    if not available and (checked_at is None or time.monotonic() - checked_at > FTS_RECHECK_INTERVAL):
+        available = FTS_TABLE in connection.introspection.table_names()
+        _fts_available[using] = (available, time.monotonic())
+    return available
+
+
+def reset_search_backend():
+    """Повторная проверка таблицы FTS при следующем поиске (после migrate в этом процессе)"""
+    _fts_available.clear()
+
+
+def search_backend(using='default'):
+    """Доступный механизм поиска: sqlite (FTS5), postgresql (tsvector + GIN) или like"""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and _has_fts_table(connection, using):
+        return 'sqlite'
+    return 'like'
+
+
+def parse_terms(query):
+    """Слова поискового запроса без операторов FTS"""
+    terms = re.findall(r'\w+', query or '')[:MAX_TERMS]
+    if not terms or len(query) > MAX_QUERY_LENGTH:
+        raise ValidationError({'q': 'Некорректный поисковый запрос'})
+    return terms
+
+
+def search_blogs(blogs, query):
+    """
+    Блоги, содержащие все слова запроса, с релевантностью в поле rank
+    (больше — релевантнее)
+    """
+    terms = parse_terms(query)
+    backend = search_backend(blogs.db)
+
+    if backend == 'sqlite':
+        match = ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+        # Таблица FTS присоединяется один раз: MATCH и bm25 считаются в том же запросе
+        return blogs.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "blogs_blog"."id"', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).annotate(rank=RawSQL(f'-bm25({FTS_TABLE})', [], output_field=models.FloatField()))
+
+    if backend == 'postgresql':
+        text = ' '.join(terms)
+        return blogs.filter(
+            RawSQL(f"{POSTGRES_DOCUMENT} @@ plainto_tsquery('simple', %s)", [text], output_field=models.BooleanField())
+        ).annotate(
+            rank=RawSQL(
+                f"ts_rank({POSTGRES_DOCUMENT}, plainto_tsquery('simple', %s))",
+                [text],
+                output_field=models.FloatField()
+            )
+        )
+
+    condition = models.Q()
+    for term in terms:
+        condition &= models.Q(title__icontains=term) | models.Q(description__icontains=term)
+    return blogs.filter(condition).annotate(rank=models.Value(0.0, output_field=models.FloatField()))
+
+
+def encode_rank_cursor(rank, blog_id):
+    raw = json.dumps([rank, blog_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_rank_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, blog_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(rank), int(blog_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise ValidationError({'cursor': 'Неверный курсор'})
+
+
+def paginate_by_rank(blogs, cursor=None, per_page=20):
+    """Keyset-пагинация по (-rank, -id), строки — словари blog_list_values без rank"""
+    blogs = blogs.order_by('-rank', '-id')
+    if cursor:
+        rank, blog_id = decode_rank_cursor(cursor)
+        blogs = blogs.filter(models.Q(rank__lt=rank) | models.Q(rank=rank, id__lt=blog_id))
+    items = list(blog_list_values(blogs, 'rank')[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_rank_cursor(items[-1]['rank'], items[-1]['id'])
+    for item in items:
+        del item['rank']
+    return items, next_cursor
@@ -1,3 +1,4 @@
+from django.db import models
 from rest_framework import serializers
 from .models import Blog
 
@@ -7,4 +8,14 @@ class BlogSerializer(serializers.ModelSerializer):
     class Meta:
         model = Blog
         fields = ['id', 'title', 'description', 'is_private', 'author', 'author_username']
-        read_only_fields = ['author']
\ No newline at end of file
+        read_only_fields = ['author']
+
+
+def blog_list_values(blogs, *extra):
+    """
+    Проекция блогов для списков: словари в формате BlogSerializer
+    (username автора берется JOIN-ом), без создания экземпляров моделей.
+    extra — дополнительные поля (например, rank для курсора поиска).
+    """
+    fields = [field for field in BlogSerializer.Meta.fields if field != 'author_username']
+    return blogs.values(*fields, *extra, author_username=models.F('author__username'))
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .cache import feed_cache
+from .counters import apply_blog_delta, bump_feed_version, touch_lists
+from .models import Blog
+from .search import reset_search_backend
+from .timeline import fan_out_blog, rebuild_pair, resync_blog, timeline_enabled
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Blog)
+def update_timelines_on_blog_save(sender, instance, created, **kwargs):
+    """Новый блог раздается в ленты, измененный — пересчитывается (удаление — каскадом)"""
+    if not timeline_enabled():
+        return
+    if created:
+        fan_out_blog(instance)
+    else:
+        resync_blog(instance)
+
+
+@receiver(post_save, sender=Blog)
+def update_counters_on_blog_save(sender, instance, created, **kwargs):
+    """Счетчики блогов: создание и переключение приватности"""
+    public = 0 if instance.is_private else 1
+    if created:
+        apply_blog_delta(instance.author_id, 1, public)
+    else:
+        previous = getattr(instance, '_loaded_is_private', None)
+        if previous is not None and previous != instance.is_private:
+            apply_blog_delta(instance.author_id, 0, 1 if previous else -1)
+    instance._loaded_is_private = instance.is_private
+
+
+@receiver(post_delete, sender=Blog)
+def update_counters_on_blog_delete(sender, instance, **kwargs):
+    is_private = getattr(instance, '_loaded_is_private', instance.is_private)
+    apply_blog_delta(instance.author_id, -1, 0 if is_private else -1)
+
+
+@receiver(post_save, sender=Blog)
+def invalidate_feed_cache_on_blog_save(sender, instance, created, **kwargs):
+    # Изменение существующего блога могло переключить приватность
+    feed_cache.bump_blogs(public=not created or not instance.is_private)
+
+
+@receiver(post_delete, sender=Blog)
+def invalidate_feed_cache_on_blog_delete(sender, instance, **kwargs):
+    feed_cache.bump_blogs(public=not instance.is_private)
+
+
+@receiver(post_save, sender=User)
+def invalidate_feed_cache_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    """В страницах ленты хранится author_username"""
+    if not created and (update_fields is None or 'username' in update_fields):
+        feed_cache.bump_blogs(public=True)
+
+
+@receiver(post_save, sender=Blog)
+def bump_feed_version_on_blog_save(sender, instance, created, **kwargs):
+    bump_feed_version(public=not created or not instance.is_private)
+
+
+@receiver(post_delete, sender=Blog)
+def bump_feed_version_on_blog_delete(sender, instance, **kwargs):
+    bump_feed_version(public=not instance.is_private)
+
+
+@receiver(post_save, sender=User)
+def bump_feed_version_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'username' in update_fields):
+        bump_feed_version(public=True)
+
+
+@receiver(m2m_changed, sender=User.blacklist.through)
+@receiver(m2m_changed, sender=User.whitelist.through)
+def on_list_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Изменение списков затрагивает только пары (владелец списка, пользователь)"""
+    if action == 'pre_clear':
+        # При очистке pk_set не передается — запоминаем затронутых пользователей заранее
+        if reverse:
+            related = sender.objects.filter(to_customuser=instance).values_list('from_customuser_id', flat=True)
+        else:
+            related = sender.objects.filter(from_customuser=instance).values_list('to_customuser_id', flat=True)
+        instance._list_cleared_ids = set(related)
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_list_cleared_ids', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    feed_cache.bump_users(instance.pk, *(pk_set or ()))
+    touch_lists(instance.pk, *(pk_set or ()))
+
+    if not timeline_enabled():
+        return
+    for pk in pk_set or ():
+        owner_id, target_id = (pk, instance.pk) if reverse else (instance.pk, pk)
+        rebuild_pair(owner_id, target_id)
+        rebuild_pair(target_id, owner_id)
+
+
+@receiver(post_migrate)
+def reset_search_backend_on_migrate(sender, **kwargs):
+    """Миграция могла создать или удалить таблицу FTS"""
+    reset_search_backend()
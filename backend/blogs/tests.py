@@ -0,0 +1,318 @@
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from accounts.authentication import generate_jwt_token
+from accounts.tests import ProcessCacheTestCase, create_user
+from backend.querystats import QueryBudgetExceeded, assert_max_queries
+from .cache import feed_cache
+from .models import Blog, TimelineEntry
+from .query_budgets import SETTINGS, measure_budgets, seed
+from .query_plans import VENDORS, explain_user, hot_queries, index_only, plan_problems
+from . import search
+
+
+class FeedCacheTests(ProcessCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.blog = Blog.objects.create(title='public', description='text', author=self.author)
+
+    def feed_titles(self):
+        response = self.client.get('/api/blogs/feed/?page=1')
+        return response['X-Cache'], [row['title'] for row in response.json()['results']]
+
+    def test_disabled_on_process_local_cache(self):
+        self.assertFalse(feed_cache.enabled)
+        self.assertEqual(self.feed_titles(), ('MISS', ['public']))
+        self.assertEqual(self.feed_titles()[0], 'MISS')
+
+    def test_shared_cache_invalidated_on_privacy_change(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+        }}):
+            self.assertTrue(feed_cache.enabled)
+            self.assertEqual(self.feed_titles(), ('MISS', ['public']))
+            self.assertEqual(self.feed_titles(), ('HIT', ['public']))
+            self.blog.is_private = True
+            self.blog.save()
+            self.assertEqual(self.feed_titles(), ('MISS', []))
+
+
+class ConditionalGetTests(ProcessCacheTestCase):
+    """ETag ленты, блогов автора и профиля: 304 без построения ответа, новая версия после изменений"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.viewer = create_user('viewer')
+        self.headers = {'Authorization': f'Bearer {generate_jwt_token(self.viewer)}'}
+        Blog.objects.create(title='public', description='text', author=self.author)
+        self.paths = (
+            '/api/blogs/feed/?page=1',
+            '/api/blogs/feed/?cursor=',
+            f'/api/blogs/user/id/{self.author.id}/blogs/?page=1',
+            '/api/accounts/profile/author/',
+        )
+
+    def get(self, path, **headers):
+        return self.client.get(path, headers={**self.headers, **headers})
+
+    def etags(self):
+        return [self.get(path)['ETag'] for path in self.paths[:3]]
+
+    def test_not_modified(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Cache-Control'], 'private, no-cache')
+                cached = self.get(path, if_none_match=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+                self.assertEqual(cached['Cache-Control'], 'private, no-cache')
+                self.assertEqual(self.get(path, if_none_match='"stale"').status_code, 200)
+
+    def test_anonymous_feed_not_modified(self):
+        etag = self.client.get('/api/blogs/feed/?page=1')['ETag']
+        self.assertNotIn(etag, self.etags())
+        self.assertEqual(self.client.get('/api/blogs/feed/?page=1', headers={'if_none_match': etag}).status_code, 304)
+
+    def test_new_etag_after_blog_change(self):
+        before = self.etags()
+        Blog.objects.create(title='second', description='text', author=self.author)
+        after = self.etags()
+        self.assertTrue(all(old != new for old, new in zip(before, after)), (before, after))
+
+    def test_new_etag_after_list_change(self):
+        before = self.etags()
+        author_headers = {'Authorization': f'Bearer {generate_jwt_token(self.author)}'}
+        response = self.client.post(f'/api/accounts/lists/blacklist/{self.viewer.id}/', headers=author_headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        after = self.etags()
+        self.assertTrue(all(old != new for old, new in zip(before, after)), (before, after))
+        response = self.get(self.paths[2], if_none_match=before[2])
+        self.assertEqual((response.status_code, response.json()), (200, []))
+
+    def test_missing_author(self):
+        self.assertEqual(self.get('/api/blogs/user/id/0/blogs/?page=1').status_code, 404)
+
+    def test_last_modified_after_current_second(self):
+        # Версия изменилась в текущую секунду — только ETag
+        response = self.get(self.paths[0])
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.get(self.paths[0], if_modified_since=http_date(time.time())).status_code, 200)
+        with mock.patch('backend.http.time.time', return_value=time.time() + 2):
+            response = self.get(self.paths[0])
+            self.assertIn('Last-Modified', response)
+            cached = self.get(self.paths[0], if_modified_since=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+
+class AsyncViewsTests(ProcessCacheTestCase):
+    """Асинхронный профиль автора отвечает так же, как синхронный"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.viewer = create_user('viewer')
+        # Запросы обновляют last_activity зрителя, поэтому сравниваются чужие профили
+        self.requester = create_user('requester')
+
+    async def assert_same(self, user, path):
+        headers = {'Authorization': f'Bearer {await sync_to_async(generate_jwt_token)(user)}'}
+        sync_response = await sync_to_async(self.client.get)(f'/api/accounts/{path}', headers=headers)
+        async_response = await self.async_client.get(f'/api/accounts/async/{path}', headers=headers)
+        self.assertEqual(
+            (async_response.status_code, async_response.json(), async_response.get('ETag')),
+            (sync_response.status_code, sync_response.json(), sync_response.get('ETag'))
+        )
+
+    async def test_same_responses(self):
+        for path in ('profile/author/', 'profile/viewer/', 'profile/nobody/'):
+            with self.subTest(path=path):
+                await self.assert_same(self.requester, path)
+
+
+@override_settings(BLOG_TIMELINE_ENABLED=True)
+class TimelineTests(ProcessCacheTestCase):
+    """Материализованная лента: построение, раздача новых блогов и пересчет после изменений"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.viewer = create_user('viewer')
+        self.public = Blog.objects.create(title='public', description='text', author=self.author)
+        self.private = Blog.objects.create(title='private', description='text', author=self.author, is_private=True)
+        call_command('backfill_timelines', user=[self.viewer.id], stdout=StringIO())
+
+    def entries(self):
+        return set(TimelineEntry.objects.filter(viewer=self.viewer).values_list('blog_id', flat=True))
+
+    def feed(self):
+        response = self.client.get(
+            '/api/blogs/feed/?page=1', headers={'Authorization': f'Bearer {generate_jwt_token(self.viewer)}'}
+        )
+        return [row['title'] for row in response.json()['results']]
+
+    def test_backfill(self):
+        self.viewer.refresh_from_db()
+        self.assertTrue(self.viewer.has_timeline)
+        self.assertEqual(self.entries(), {self.public.id})
+        # Лента читается из записей: удаленная запись пропадает из ленты
+        TimelineEntry.objects.filter(viewer=self.viewer).delete()
+        self.assertEqual(self.feed(), [])
+
+        call_command('backfill_timelines', existing=True, stdout=StringIO())
+        self.assertEqual(self.feed(), ['public'])
+
+        # Кэш пользователей сбрасывается после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_timelines', user=[self.viewer.id], drop=True, stdout=StringIO())
+        self.viewer.refresh_from_db()
+        self.assertEqual((self.viewer.has_timeline, self.entries()), (False, set()))
+        self.assertEqual(self.feed(), ['public'])
+
+    def test_feed_without_timeline_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.feed(), ['public'])
+        self.assertFalse([query['sql'] for query in queries if '"blogs_timeline"' in query['sql']])
+
+    def test_fan_out_on_create(self):
+        blog = Blog.objects.create(title='new', description='text', author=self.author)
+        secret = Blog.objects.create(title='secret', description='text', author=self.author, is_private=True)
+        self.assertEqual(self.entries(), {self.public.id, blog.id})
+        self.assertNotIn(secret.id, self.entries())
+        self.assertEqual(self.feed(), ['new', 'public'])
+
+    def test_privacy_change(self):
+        self.public.is_private = True
+        self.public.save()
+        self.assertEqual(self.entries(), set())
+        self.private.is_private = False
+        self.private.save()
+        self.assertEqual(self.entries(), {self.private.id})
+
+    def test_rebuild_pair_after_list_change(self):
+        self.author.whitelist.add(self.viewer)
+        self.assertEqual(self.entries(), {self.public.id, self.private.id})
+        self.author.blacklist.add(self.viewer)
+        self.author.whitelist.remove(self.viewer)
+        self.assertEqual(self.entries(), set())
+        self.author.blacklist.remove(self.viewer)
+        self.assertEqual(self.entries(), {self.public.id})
+        self.assertEqual(self.feed(), ['public'])
+
+
+class QueryPlanTests(ProcessCacheTestCase):
+    """Горячие запросы лент и списков идут по индексам (EXPLAIN)"""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor not in VENDORS:
+            self.skipTest(f'Планы {connection.vendor} не разбираются')
+
+    def test_hot_queries_use_indexes(self):
+        with index_only(connection):
+            for name, queryset, allowed_scans in hot_queries(explain_user()):
+                with self.subTest(name):
+                    plan, problems = plan_problems(connection, queryset, allowed_scans)
+                    self.assertEqual(problems, [], plan)
+
+
+class AssertMaxQueriesTests(ProcessCacheTestCase):
+    def test_within_budget(self):
+        with assert_max_queries(1) as recorder:
+            list(Blog.objects.all())
+        self.assertEqual(recorder.count, 1)
+
+    def test_over_budget_lists_queries(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'feed: 2 SQL-запросов при бюджете 1'):
+            with assert_max_queries(1, 'feed'):
+                list(Blog.objects.all())
+                Blog.objects.count()
+
+
+# Бюджеты не включают запись времени активности: она идет не чаще раза в минуту на пользователя
+@override_settings(ACTIVITY_MIN_WRITE_INTERVAL=60, **SETTINGS)
+class QueryBudgetTests(ProcessCacheTestCase):
+    """Представления укладываются в свой query_budget с пустыми кэшами процесса"""
+
+    def test_views_within_budgets(self):
+        for row in measure_budgets(seed()):
+            with self.subTest(row['case']):
+                self.assertLess(row['status'], 400)
+                self.assertIsNone(row['error'])
+
+
+class SearchTests(ProcessCacheTestCase):
+    """Поиск: FTS5 в SQLite и запасной LIKE дают одни и те же блоги с учетом видимости"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user('author')
+        self.stranger = create_user('stranger')
+        self.viewer = create_user('viewer')
+        self.headers = {'Authorization': f'Bearer {generate_jwt_token(self.viewer)}'}
+        self.once = Blog.objects.create(title='django tips', description='python web', author=self.author)
+        self.twice = Blog.objects.create(title='django django', description='python python', author=self.author)
+        Blog.objects.create(title='django only', description='no second term', author=self.author)
+        Blog.objects.create(title='django secret', description='python', author=self.stranger, is_private=True)
+
+    def search(self, query, **params):
+        response = self.client.get('/api/blogs/search/', {'q': query, **params}, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def titles(self, query, **params):
+        return [row['title'] for row in self.search(query, **params)['results']]
+
+    def require_fts(self):
+        if search.search_backend() != 'sqlite':
+            self.skipTest('SQLite без FTS5')
+
+    def test_rank_order(self):
+        self.require_fts()
+        self.assertEqual(self.titles('python django'), ['django django', 'django tips'])
+
+    def test_recent_order(self):
+        self.assertEqual(self.titles('python django', order='recent'), ['django django', 'django tips'])
+        self.assertEqual(self.titles('Django', order='recent'), ['django only', 'django django', 'django tips'])
+
+    def test_rank_cursor(self):
+        self.require_fts()
+        for number in range(25):
+            Blog.objects.create(title=f'cursor {number}', description='paging ' * (number % 4 + 1), author=self.author)
+        first = self.search('paging')
+        second = self.search('paging', cursor=first['next_cursor'])
+        self.assertEqual((len(first['results']), len(second['results'])), (20, 5))
+        self.assertIsNone(second['next_cursor'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_like_fallback_matches_fts(self):
+        expected = sorted(self.titles('python django', order='recent'))
+        with mock.patch('blogs.search.search_backend', return_value='like'):
+            self.assertEqual(sorted(self.titles('python django')), expected)
+            self.assertEqual(self.titles('python django', order='recent'), ['django django', 'django tips'])
+
+    def test_invalid_requests(self):
+        for params in ({'q': ''}, {'q': 'django', 'order': 'title'}, {'q': 'django', 'cursor': '!'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/blogs/search/', params, headers=self.headers)
+                self.assertEqual(response.status_code, 400)
+
+    def test_missing_fts_table_rechecked(self):
+        self.require_fts()
+        search._fts_available['default'] = (False, time.monotonic())
+        self.assertEqual(search.search_backend(), 'like')
+        search._fts_available['default'] = (False, time.monotonic() - search.FTS_RECHECK_INTERVAL - 1)
+        self.assertEqual(search.search_backend(), 'sqlite')
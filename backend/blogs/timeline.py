@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+
+from .counters import evict_users
+from .models import Blog, Timeline, TimelineEntry
+from .utils import filter_visible_blogs
+
+BATCH_SIZE = 1000
+
+
+def timeline_enabled():
+    return getattr(settings, 'BLOG_TIMELINE_ENABLED', False)
+
+
+def timeline_blogs(user):
+    """Блоги материализованной ленты — диапазонный проход по индексу (viewer, blog)"""
+    # Сортировка по blog_id записи ленты (равен id блога) идет по индексу без временной сортировки
+    return Blog.objects.filter(timeline_entries__viewer=user).order_by('-timeline_entries__blog_id')
+
+
+def _insert_entries(viewer_id, blog_ids):
+    batch = []
+    for blog_id in blog_ids:
+        batch.append(TimelineEntry(viewer_id=viewer_id, blog_id=blog_id))
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def timeline_viewers(blog):
+    """
+    Зрители с материализованной лентой, которым виден блог:
+    без взаимных черных списков с автором, приватный блог — только автор и белый список
+    """
+    User = get_user_model()
+    author = blog.author
+    viewers = User.objects.filter(has_timeline=True).exclude(
+        id__in=author.blacklist.values('id')
+    ).exclude(
+        id__in=author.blacklisted_by.values('id')
+    )
+    if blog.is_private:
+        viewers = viewers.filter(models.Q(id=author.id) | models.Q(id__in=author.whitelist.values('id')))
+    return viewers.values_list('id', flat=True)
+
+
+def fan_out_blog(blog):
+    """Добавление нового блога в ленты зрителей"""
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(viewer_id=viewer_id, blog=blog) for viewer_id in timeline_viewers(blog)],
+        ignore_conflicts=True,
+        batch_size=BATCH_SIZE
+    )
+
+
+@transaction.atomic
+def resync_blog(blog):
+    """Пересчет лент для измененного блога (например, смена приватности)"""
+    TimelineEntry.objects.filter(blog=blog).delete()
+    fan_out_blog(blog)
+
+
+@transaction.atomic
+def rebuild_pair(viewer_id, author_id):
+    """Пересчет блогов автора в ленте зрителя после изменения списков"""
+    viewer = get_user_model().objects.filter(id=viewer_id, has_timeline=True).first()
+    if viewer is None:
+        return
+    TimelineEntry.objects.filter(viewer=viewer, blog__author_id=author_id).delete()
+    blogs = filter_visible_blogs(Blog.objects.filter(author_id=author_id), viewer)
+    _insert_entries(viewer.id, blogs.values_list('id', flat=True))
+
+
+def _set_flag(viewer, value):
+    """Флаг has_timeline пользователя: по нему лента выбирает запрос без отдельной проверки"""
+    get_user_model().objects.filter(id=viewer.id).update(has_timeline=value)
+    evict_users(viewer.id)
+
+
+@transaction.atomic
+def rebuild_timeline(viewer):
+    """Полное построение материализованной ленты зрителя"""
+    Timeline.objects.update_or_create(viewer=viewer)
+    _set_flag(viewer, True)
+    TimelineEntry.objects.filter(viewer=viewer).delete()
+    blogs = filter_visible_blogs(Blog.objects.all(), viewer)
+    _insert_entries(viewer.id, blogs.values_list('id', flat=True).iterator(chunk_size=BATCH_SIZE))
+
+
+@transaction.atomic
+def drop_timeline(viewer):
+    """Возврат зрителя на обычный запрос ленты"""
+    _set_flag(viewer, False)
+    Timeline.objects.filter(viewer=viewer).delete()
+    TimelineEntry.objects.filter(viewer=viewer).delete()
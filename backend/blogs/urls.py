@@ -1,8 +1,15 @@
 from django.urls import path
-from .views import BlogAPIView, UserBlogsAPIView
+from .views import (
+    AsyncUserBlogsExportView, BlogAPIView, BlogSearchAPIView, UserBlogsAPIView, UserBlogsExportView
+)
 
 urlpatterns = [
     # Работа с блогами
     path('feed/', BlogAPIView.as_view(), name='blog-feed'),
     path('user/id/<int:user_id>/blogs/', UserBlogsAPIView.as_view(), name='user-blogs-by-id'),
+    path('user/id/<int:user_id>/blogs/export/', UserBlogsExportView.as_view(), name='user-blogs-export'),
+    path('search/', BlogSearchAPIView.as_view(), name='blog-search'),
+
+    # Асинхронные версии для ASGI
+    path('async/user/id/<int:user_id>/blogs/export/', AsyncUserBlogsExportView.as_view(), name='user-blogs-export-async'),
 ]
@@ -1,5 +1,15 @@
+import base64
+import binascii
+
 from django.db import models
 from django.core.paginator import Paginator
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import ValidationError
+from accounts.acl import acl_graph
+from .serializers import blog_list_values
+
+# Максимум id из списков, подставляемых в запрос через IN (...)
+ACL_INLINE_LIMIT = 500
 
 
 def filter_visible_blogs(blogs, user):
@@ -9,26 +19,139 @@ def filter_visible_blogs(blogs, user):
     - Если пользователь в черном списке автора ИЛИ
     - Если автор в черном списке пользователя
     то блог не отображается
+    Приватные блоги видны автору и его белому списку.
+    Фильтрация выполняется одним запросом: при коротких списках id берутся
+    из индекса acl_graph, иначе — подзапросы EXISTS по промежуточным таблицам.
+    """
+    entry = acl_graph.user_entry(user)
+    blocked = set(entry.blacklist).union(entry.blacklisted_by)
+    if len(blocked) + len(entry.whitelisted_by) <= ACL_INLINE_LIMIT:
+        return blogs.exclude(
+            author_id__in=blocked
+        ).filter(
+            models.Q(is_private=False) | models.Q(author=user) | models.Q(author_id__in=entry.whitelisted_by)
+        )
+    return filter_visible_blogs_by_subqueries(blogs, user)
+
+
+def filter_visible_blogs_by_subqueries(blogs, user):
+    """Те же правила видимости через подзапросы EXISTS (для длинных списков)"""
+    User = get_user_model()
+    blacklist = User.blacklist.through.objects
+    whitelist = User.whitelist.through.objects
+
+    user_in_author_blacklist = blacklist.filter(
+        from_customuser=models.OuterRef('author'), to_customuser=user
+    )
+    author_in_user_blacklist = blacklist.filter(
+        from_customuser=user, to_customuser=models.OuterRef('author')
+    )
+    user_in_author_whitelist = whitelist.filter(
+        from_customuser=models.OuterRef('author'), to_customuser=user
+    )
+
+    return blogs.exclude(
+        models.Exists(user_in_author_blacklist)
+    ).exclude(
+        models.Exists(author_in_user_blacklist)
+    ).filter(
+        models.Q(is_private=False) | models.Q(author=user) | models.Exists(user_in_author_whitelist)
+    )
+
+
+def visible_blogs(blogs, user, is_moderator):
+    """Блоги, видимые пользователю: аноним — публичные, модератор — все, остальные — по спискам"""
+    if not user:
+        return blogs.filter(is_private=False)
+    if is_moderator:
+        return blogs
+    return filter_visible_blogs(blogs, user)
+
+
+def visible_author_blogs(blogs, user, author, is_moderator):
     """
-    visible_blogs = []
-    for blog in blogs:
-        author = blog.author
-        
-        user_in_author_blacklist = hasattr(author, 'blacklist') and user in author.blacklist.all()
-        author_in_user_blacklist = hasattr(user, 'blacklist') and author in user.blacklist.all()
-        
-        if user_in_author_blacklist or author_in_user_blacklist:
-            continue
-            
-        if blog.is_private:
-            if user == author or (hasattr(author, 'whitelist') and user in author.whitelist.all()):
-                visible_blogs.append(blog)
-                
-        else:
-            visible_blogs.append(blog)
-    return visible_blogs
-
-def paginate_blogs(blogs, page_number, per_page=20):
+    Блоги автора (blogs — его запрос), видимые пользователю, и видны ли среди них приватные:
+    модератор и сам автор видят все, приватные блоги видны белому списку автора.
+    Пользователю из черного списка автора — (blogs.none(), None)
+    """
+    if is_moderator or user == author:
+        return blogs, True
+    entry = acl_graph.user_entry(user)
+    if entry.is_blacklisted_by(author.id):
+        return blogs.none(), None
+    include_private = entry.is_whitelisted_by(author.id)
+    return (blogs if include_private else blogs.filter(is_private=False)), include_private
+
+
+def paginate_blogs(blogs, page_number, per_page=20, count=None):
     paginator = Paginator(blogs, per_page)
+    if count is not None:
+        # Известное количество (счетчики) вместо COUNT(*)
+        paginator.count = count
     page = paginator.get_page(page_number)
     return page, paginator
+
+
+def encode_cursor(blog_id):
+    """Непрозрачный курсор из id последнего блога на странице"""
+    return base64.urlsafe_b64encode(str(blog_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбор курсора, некорректный курсор — ошибка 400"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        blog_id = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeError, ValueError):
+        blog_id = 0
+    if blog_id <= 0:
+        raise ValidationError({'cursor': 'Неверный курсор'})
+    return blog_id
+
+
+def paginate_blogs_by_cursor(blogs, cursor=None, per_page=20):
+    """
+    Keyset-пагинация по -id: страница N стоит столько же, сколько первая,
+    COUNT(*) не выполняется. Возвращает строки страницы (словари blog_list_values)
+    и курсор следующей. Уже отсортированный запрос должен быть упорядочен по убыванию id.
+    """
+    if not blogs.ordered:
+        blogs = blogs.order_by('-id')
+    if cursor:
+        blogs = blogs.filter(id__lt=decode_cursor(cursor))
+    items = list(blog_list_values(blogs)[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(items[-1]['id'])
+    return items, next_cursor
+
+
+def paginated_blogs_data(blogs, query_params, get_count=None):
+    """
+    Данные страницы блогов: при ?cursor= — keyset-режим (results, next_cursor),
+    иначе — постраничный режим (?page=) с count и num_pages.
+    Строки строятся проекцией blog_list_values, формат совпадает с BlogSerializer.
+    get_count — функция, возвращающая (count, estimated) по счетчикам;
+    count=None означает точный COUNT(*) по запросу.
+    Асинхронные представления вызывают ее через sync_to_async — все запросы
+    страницы выполняются за один переход в поток ORM.
+    """
+    if 'cursor' in query_params:
+        items, next_cursor = paginate_blogs_by_cursor(blogs, query_params.get('cursor'))
+        return {
+            'results': items,
+            'next_cursor': next_cursor
+        }
+
+    count, estimated = get_count() if get_count else (None, False)
+    page, paginator = paginate_blogs(blog_list_values(blogs), query_params.get('page', 1), count=count)
+    data = {
+        'results': list(page.object_list),
+        'count': paginator.count,
+        'num_pages': paginator.num_pages,
+        'page': page.number
+    }
+    if estimated:
+        data['count_estimated'] = True
+    return data
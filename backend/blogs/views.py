@@ -1,24 +1,62 @@
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.shortcuts import get_object_or_404
-from .models import Blog
-from .serializers import BlogSerializer
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from .models import Blog, BlogCounter
+from .serializers import BlogSerializer, blog_list_values
 from django.contrib.auth import get_user_model
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .utils import filter_visible_blogs, paginate_blogs
+from .utils import paginate_blogs_by_cursor, paginated_blogs_data, visible_author_blogs, visible_blogs
+from .search import paginate_by_rank, search_blogs
+from .cache import feed_cache
+from .counters import feed_count, global_count, user_blogs_count
+from .timeline import timeline_blogs, timeline_enabled
+from accounts.async_api import AsyncAPIView
+from accounts.permissions import aget_capabilities, get_capabilities
+from backend.http import not_modified, set_validators
+from backend.streaming import export_chunk_size, ndjson_response
+from .conditional import feed_validators, user_blogs_validators
 
 User = get_user_model()
 
 class BlogAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    # SQL-запросов на запрос с холодными кэшами процесса (backend.querystats, check_query_budgets)
+    query_budget = {'get': 7, 'post': 7, 'delete': 9}
+
+    def get_page_data(self, user, is_moderator, query_params):
+        return paginated_blogs_data(
+            self.get_visible_blogs(user, is_moderator),
+            query_params,
+            get_count=lambda: self.get_feed_count(user, is_moderator)
+        )
+
+    def get_visible_blogs(self, user, is_moderator):
+        """Блоги ленты, видимые пользователю"""
+        # Материализованная лента (fan-out on write), если построена для пользователя;
+        # флаг has_timeline приходит с пользователем (кэш аутентификации), без запроса
+        if user and not is_moderator and timeline_enabled() and user.has_timeline:
+            return timeline_blogs(user)
+
+        # Аноним — публичные блоги, модератор — все, остальные — по приватности и взаимным спискам
+        return visible_blogs(Blog.objects.order_by('-id'), user, is_moderator)
+
+    def get_feed_count(self, user, is_moderator):
+        """Количество блогов ленты по денормализованным счетчикам"""
+        if not user:
+            return global_count(BlogCounter.PUBLIC), False
+        if is_moderator:
+            return global_count(BlogCounter.TOTAL), False
+        return feed_count(user)
 
     @swagger_auto_schema(
     operation_description="Получение ленты блогов. Публичные блоги доступны без авторизации.",
     responses={200: BlogSerializer(many=True)},
     manual_parameters=[
-        openapi.Parameter('page', openapi.IN_QUERY, description="Номер страницы", type=openapi.TYPE_INTEGER)
+        openapi.Parameter('page', openapi.IN_QUERY, description="Номер страницы", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="Курсор страницы (next_cursor), без подсчета count", type=openapi.TYPE_STRING)
     ]
     )
     def get(self, request):
@@ -26,45 +64,28 @@ class BlogAPIView(APIView):
         Получение ленты блогов (20 на страницу, ?page=1)
         Публичные блоги доступны без авторизации.
         Для авторизованных пользователей — приватность и списки.
+        Поддерживаются условные запросы (If-None-Match / If-Modified-Since).
         """
-        page_number = request.query_params.get('page', 1)
-        blogs = Blog.objects.all().order_by('-id')
-
         user = request.user if request.user.is_authenticated else None
+        is_moderator = get_capabilities(request).can_moderate
 
-        # Только публичные блоги для неавторизованных
-        if not user:  
-            public_blogs = blogs.filter(is_private=False)
-            page, paginator = paginate_blogs(public_blogs, page_number)
-            serializer = BlogSerializer(page.object_list, many=True)
-            return Response({
-                'results': serializer.data,
-                'count': paginator.count,
-                'num_pages': paginator.num_pages,
-                'page': page.number
-            })
-
-        # Админ или модератор видит все посты
-        if user.is_superuser or user.groups.filter(name__in=['moderator']).exists():
-            page, paginator = paginate_blogs(blogs, page_number)
-            serializer = BlogSerializer(page.object_list, many=True)
-            return Response({
-                'results': serializer.data,
-                'count': paginator.count,
-                'num_pages': paginator.num_pages,
-                'page': page.number
-            })
-
-        # Фильтрация по приватности и взаимным черным спискам
-        visible_blogs = filter_visible_blogs(blogs, user)
-        page, paginator = paginate_blogs(visible_blogs, page_number)
-        serializer = BlogSerializer(page.object_list, many=True)
-        return Response({
-            'results': serializer.data,
-            'count': paginator.count,
-            'num_pages': paginator.num_pages,
-            'page': page.number
-        })
+        # Версия ленты проверяется до тяжелого запроса
+        etag, last_modified = feed_validators(user, is_moderator, request.query_params)
+        if etag:
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+        cache_key = feed_cache.page_key(user, is_moderator, request.query_params) if feed_cache.enabled else None
+        data = feed_cache.get(cache_key) if cache_key else None
+        if data is not None:
+            response = Response(data, headers={'X-Cache': 'HIT'})
+        else:
+            data = self.get_page_data(user, is_moderator, request.query_params)
+            if cache_key:
+                feed_cache.set(cache_key, data)
+            response = Response(data, headers={'X-Cache': 'MISS'})
+        return set_validators(response, etag, last_modified) if etag else response
 
     @swagger_auto_schema(
         operation_description="Создание блога. Автором становится текущий пользователь.",
@@ -101,20 +122,35 @@ class BlogAPIView(APIView):
         blog_id = request.data.get('blog_id') or request.query_params.get('blog_id')
         blog = get_object_or_404(Blog, id=blog_id)
         user = request.user
-        if blog.author == user or user.is_superuser or user.groups.filter(name__in=['moderator']).exists():
+        if blog.author_id == user.id or get_capabilities(request).can_moderate:
             blog.delete()
             return Response({'status': 'deleted'})
         return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
+
 class UserBlogsAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 6
+
+    def get_page_data(self, user_id, user, is_moderator, query_params):
+        target_user = get_object_or_404(User, id=user_id)
+        blogs, include_private = visible_author_blogs(
+            Blog.objects.filter(author=target_user).order_by('-id'), user, target_user, is_moderator
+        )
+        if include_private is None:
+            return []
+        return paginated_blogs_data(
+            blogs, query_params,
+            get_count=lambda: (user_blogs_count(target_user, include_private), False)
+        )
 
     @swagger_auto_schema(
         operation_description="Получение блогов пользователя по id с пагинацией (?page=1).",
         responses={200: BlogSerializer(many=True)},
         manual_parameters=[
             openapi.Parameter('user_id', openapi.IN_PATH, description="ID пользователя", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('page', openapi.IN_QUERY, description="Номер страницы", type=openapi.TYPE_INTEGER)
+            openapi.Parameter('page', openapi.IN_QUERY, description="Номер страницы", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Курсор страницы (next_cursor), без подсчета count", type=openapi.TYPE_STRING)
         ]
     )
     def get(self, request, user_id):
@@ -123,48 +159,100 @@ class UserBlogsAPIView(APIView):
         Админ и модератор видят все посты независимо от списков.
         Приватные блоги видны только для автора и его белого списка.
         Если пользователь в черном списке автора, ничего не возвращается.
+        Поддерживаются условные запросы, как у ленты.
+        """
+        is_moderator = get_capabilities(request).can_moderate
+        etag, last_modified = user_blogs_validators(user_id, request.user, is_moderator, request.query_params)
+        if etag:
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+        response = Response(self.get_page_data(user_id, request.user, is_moderator, request.query_params))
+        return set_validators(response, etag, last_modified) if etag else response
+
+
+class UserBlogsExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    # Без query_budget: строки выбираются при отправке тела, после замера запросов представления
+
+    @swagger_auto_schema(
+        operation_description="Выгрузка всех видимых блогов пользователя одним потоком NDJSON "
+                              "(объект BlogSerializer на строку, новые первыми). "
+                              "При Accept-Encoding: gzip ответ сжимается.",
+        responses={200: 'application/x-ndjson'},
+        manual_parameters=[
+            openapi.Parameter('user_id', openapi.IN_PATH, description="ID пользователя", type=openapi.TYPE_INTEGER)
+        ]
+    )
+    def get(self, request, user_id):
+        """
+        Экспорт блогов пользователя по id с теми же правилами видимости,
+        что у UserBlogsAPIView; из черного списка автора — пустой поток.
+        Строки читаются из курсора БД пачками, память сервера не зависит от числа блогов.
         """
         target_user = get_object_or_404(User, id=user_id)
-        blogs = Blog.objects.filter(author=target_user)
-        user = request.user
-        page_number = request.query_params.get('page', 1)
-
-        # Админ или модератор видит все
-        if user.is_superuser or user.groups.filter(name__in=['moderator']).exists():
-            page, paginator = paginate_blogs(blogs, page_number)
-            serializer = BlogSerializer(page.object_list, many=True)
-            return Response({
-                'results': serializer.data,
-                'count': paginator.count,
-                'num_pages': paginator.num_pages,
-                'page': page.number
-            })
-
-        # Проверка черного списка
-        if hasattr(target_user, 'blacklist') and user in target_user.blacklist.all():
-            return Response([])
-
-        # Приватные блоги доступны только автору и тем, кто в белом списке
-        if user == target_user:
-            page, paginator = paginate_blogs(blogs, page_number)
-            serializer = BlogSerializer(page.object_list, many=True)
-            return Response({
-                'results': serializer.data,
-                'count': paginator.count,
-                'num_pages': paginator.num_pages,
-                'page': page.number
-            })
-            
+        blogs, _ = visible_author_blogs(
+            Blog.objects.filter(author=target_user).order_by('-id'),
+            request.user, target_user, get_capabilities(request).can_moderate
+        )
+        chunk_size = export_chunk_size()
+        return ndjson_response(
+            request, blog_list_values(blogs).iterator(chunk_size=chunk_size),
+            f'blogs-{target_user.id}.ndjson', chunk_size
+        )
+
+
+class AsyncUserBlogsExportView(AsyncAPIView):
+    """Асинхронная версия экспорта блогов пользователя (GET user/id/<id>/blogs/export/) для ASGI"""
+    require_authentication = True
+    # Без query_budget: строки выбираются при отправке тела, после замера запросов представления
+
+    async def get(self, request, user_id):
+        target_user = await aget_object_or_404(User, id=user_id)
+        blogs, _ = await sync_to_async(visible_author_blogs)(
+            Blog.objects.filter(author=target_user).order_by('-id'),
+            request.user, target_user, (await aget_capabilities(request)).can_moderate
+        )
+        chunk_size = export_chunk_size()
+        return ndjson_response(
+            request, blog_list_values(blogs).aiterator(chunk_size=chunk_size),
+            f'blogs-{target_user.id}.ndjson', chunk_size
+        )
+
+
+class BlogSearchAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Полнотекстовый поиск по блогам с учетом видимости (как в ленте).",
+        responses={200: BlogSerializer(many=True), 400: 'Bad request'},
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Поисковый запрос", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('order', openapi.IN_QUERY, description="rank (по релевантности) или recent (новые первыми)", type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Курсор страницы (next_cursor)", type=openapi.TYPE_STRING)
+        ]
+    )
+    def get(self, request):
+        """
+        Поиск блогов по заголовку и описанию (20 на страницу, ?cursor=).
+        Применяются те же правила видимости, что и в ленте.
+        """
+        user = request.user if request.user.is_authenticated else None
+        is_moderator = get_capabilities(request).can_moderate
+
+        blogs = visible_blogs(Blog.objects.all(), user, is_moderator)
+        found = search_blogs(blogs, request.query_params.get('q', ''))
+        cursor = request.query_params.get('cursor')
+
+        order = request.query_params.get('order', 'rank')
+        if order == 'rank':
+            items, next_cursor = paginate_by_rank(found, cursor)
+        elif order == 'recent':
+            items, next_cursor = paginate_blogs_by_cursor(found, cursor)
         else:
-            allowed_private = hasattr(target_user, 'whitelist') and user in target_user.whitelist.all()
-            public_blogs = blogs.filter(is_private=False)
-            private_blogs = blogs.filter(is_private=True) if allowed_private else Blog.objects.none()
-            result_blogs = public_blogs | private_blogs
-            page, paginator = paginate_blogs(result_blogs, page_number)
-            serializer = BlogSerializer(page.object_list, many=True)
-            return Response({
-                'results': serializer.data,
-                'count': paginator.count,
-                'num_pages': paginator.num_pages,
-                'page': page.number
-            })
+            return Response({'error': 'Неверный порядок сортировки'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'results': items,
+            'next_cursor': next_cursor
+        })